@@ -15,58 +15,136 @@ jwt = JWTManager()
 
 def create_app():
     app = Flask(__name__)
+    # 部署在反向代理后时，按可信代理层数从 X-Forwarded-For 还原客户端IP（request.remote_addr）
+    if Config.TRUSTED_PROXY_COUNT > 0:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.TRUSTED_PROXY_COUNT)
     app.config.from_object(Config)
     
+    # 初始化日志（队列异步写出的JSON日志）
+    from utils.logger import setup_logging
+    setup_logging(Config)
+    
     # 在调用前定义setup_scheduler_tasks函数
     def setup_scheduler_tasks():
         """设置定时任务"""
-        from models.merchant import Merchant
-        from routes.merchant import calculate_merchant_status
         from datetime import datetime
         
-        def update_merchants_status():
-            """每隔60秒更新所有商户的营业状态"""
+        def resync_merchant_status_job():
+            """低频全量校准商户营业状态；平时由营业状态调度在开店/打烊时刻精确更新"""
+            from services.merchant_status_service import resync_merchant_status
             try:
                 with app.app_context():
-                    # 获取所有商户
-                    merchants = Merchant.query.all()
-                    # print(f"[{datetime.now()}] 定时任务开始，找到 {len(merchants)} 个商户")
-                    
-                    updated_count = 0
-                    for merchant in merchants:
-                        # print(f"[{datetime.now()}] 正在处理商户ID: {merchant.id}, 当前状态: {'营业中' if merchant.is_open else '已关闭'}, 营业时间: {merchant.business_hours or '未设置'}")
-                        # 计算新的营业状态
-                        new_is_open = calculate_merchant_status(merchant)
-                        
-                        # 如果状态发生变化，更新数据库
-                        if merchant.is_open != new_is_open:
-                            merchant.is_open = new_is_open
-                            updated_count += 1
-                            # print(f"[{datetime.now()}] 商户ID {merchant.id} 状态更新为: {'营业中' if new_is_open else '已关闭'}")
-                    
-                    # 提交所有更改
-                    db.session.commit()
-                
-                # if updated_count > 0:
-                    # print(f"[{datetime.now()}] 定时任务完成，更新了 {updated_count} 个商户的营业状态")
+                    resync_merchant_status()
             except Exception as e:
-                print(f"[{datetime.now()}] 定时任务执行失败: {str(e)}")
-                # 如果有异常，回滚事务
+                print(f"[{datetime.now()}] 商户营业状态校准失败: {str(e)}")
                 with app.app_context():
                     db.session.rollback()
         
         # 添加定时任务
         scheduler.add_job(
-            func=update_merchants_status,
+            func=resync_merchant_status_job,
             trigger='interval',
-            seconds=60,
-            id='update_merchants_status',
+            minutes=Config.MERCHANT_STATUS_RESYNC_MINUTES,
+            id='resync_merchant_status',
             misfire_grace_time=900,
+            coalesce=True,
+            replace_existing=True
+        )
+        print("定时任务 'resync_merchant_status' 已添加")
+        
+        def sync_merchant_hours_job():
+            """同步最近修改过营业时间的商户（请求可能由调度器以外的进程处理）"""
+            from services.merchant_status_service import sync_changed_merchants
+            try:
+                with app.app_context():
+                    sync_changed_merchants()
+            except Exception as e:
+                print(f"[{datetime.now()}] 商户营业时间同步失败: {str(e)}")
+                with app.app_context():
+                    db.session.rollback()
+        
+        scheduler.add_job(
+            func=sync_merchant_hours_job,
+            trigger='interval',
+            seconds=Config.MERCHANT_HOURS_SYNC_SECONDS,
+            id='sync_merchant_hours',
+            coalesce=True,
             replace_existing=True
         )
-        print("定时任务 'update_merchants_status' 已添加")
+        print("定时任务 'sync_merchant_hours' 已添加")
+        
+        def rebuild_merchant_stats_job():
+            """每天凌晨根据订单表重建商户经营汇总，修正增量维护可能产生的偏差"""
+            from services.stats_rollup_service import rebuild_merchant_stats
+            try:
+                with app.app_context():
+                    rebuild_merchant_stats()
+            except Exception as e:
+                print(f"[{datetime.now()}] 商户经营汇总重建失败: {str(e)}")
+                with app.app_context():
+                    db.session.rollback()
+        
+        scheduler.add_job(
+            func=rebuild_merchant_stats_job,
+            trigger='cron',
+            hour=3,
+            minute=30,
+            id='rebuild_merchant_stats',
+            misfire_grace_time=3600,
+            replace_existing=True
+        )
+        print("定时任务 'rebuild_merchant_stats' 已添加")
+        
+        def process_outbox_job():
+            """轮询发件箱，处理支付后发券、订单通知等异步事件"""
+            from services.outbox_service import process_outbox
+            try:
+                with app.app_context():
+                    process_outbox()
+            except Exception as e:
+                print(f"[{datetime.now()}] 发件箱处理失败: {str(e)}")
+                with app.app_context():
+                    db.session.rollback()
+        
+        if Config.OUTBOX_ASYNC:
+            scheduler.add_job(
+                func=process_outbox_job,
+                trigger='interval',
+                seconds=Config.OUTBOX_POLL_SECONDS,
+                id='process_outbox',
+                max_instances=1,
+                coalesce=True,
+                replace_existing=True
+            )
+            print("定时任务 'process_outbox' 已添加")
+        
+        def dispatch_notifications_job():
+            """轮询通知队列，按接收人合并后发送订单通知"""
+            from services.notification_service import dispatch_notifications
+            try:
+                with app.app_context():
+                    dispatch_notifications()
+            except Exception as e:
+                print(f"[{datetime.now()}] 通知发送失败: {str(e)}")
+                with app.app_context():
+                    db.session.rollback()
+        
+        if Config.NOTIFICATION_ASYNC:
+            scheduler.add_job(
+                func=dispatch_notifications_job,
+                trigger='interval',
+                seconds=Config.NOTIFICATION_POLL_SECONDS,
+                id='dispatch_notifications',
+                max_instances=1,
+                coalesce=True,
+                replace_existing=True
+            )
+            print("定时任务 'dispatch_notifications' 已添加")
     
-    # 初始化插件
+    # 初始化插件（先注册 SQLite 连接参数钩子，保证每个连接都生效）
+    from utils.sqlite_pragmas import register_sqlite_pragmas
+    register_sqlite_pragmas(Config.SQLITE_PRAGMAS)
     db.init_app(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
@@ -112,6 +190,36 @@ def create_app():
     app.register_blueprint(order_bp, url_prefix='/api/order')
     app.register_blueprint(common_bp, url_prefix='/api/common')
 
+    # 命令行维护命令：flask --app app rebuild-dish-sales
+    @app.cli.command('rebuild-dish-sales')
+    def rebuild_dish_sales_command():
+        """根据已送达订单重建菜品销量计数"""
+        from services.sales_service import rebuild_dish_sales
+        updated = rebuild_dish_sales()
+        print(f'已重建 {updated} 个菜品的销量')
+
+    # 命令行维护命令：flask --app app rebuild-merchant-stats
+    @app.cli.command('rebuild-merchant-stats')
+    def rebuild_merchant_stats_command():
+        """根据订单表重建商户小时/天级经营汇总"""
+        from services.stats_rollup_service import rebuild_merchant_stats
+        buckets = rebuild_merchant_stats()
+        print(f'已重建 {buckets} 个小时桶的商户经营汇总')
+
+    # 命令行检查命令：flask --app app check-query-plans（有热点查询全表扫描时返回非0退出码）
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """检查热点查询的执行计划是否使用索引"""
+        from utils.query_plan import check_query_plans
+        failed = 0
+        for name, plan, scans in check_query_plans():
+            print(f"[{'全表扫描' if scans else '使用索引'}] {name}：{'; '.join(plan)}")
+            failed += bool(scans)
+        if failed:
+            print(f'{failed} 个热点查询存在全表扫描')
+            raise SystemExit(1)
+        print('所有热点查询均使用索引')
+
     # 补充页面路由：访问URL时返回对应的HTML页面
     from flask import render_template  # 导入渲染模板的函数
 
@@ -120,8 +228,7 @@ def create_app():
     def student_login_page():
         # 检查系统是否处于维护中
         from models.platform_config import PlatformConfig
-        maintenance_config = PlatformConfig.get_by_key('system_maintenance')
-        is_maintenance = maintenance_config and maintenance_config.config_value.lower() == 'true'
+        is_maintenance = PlatformConfig.is_maintenance()
         return render_template('student/login.html', is_maintenance=is_maintenance)  # 对应templates/student/login.html
 
     @app.route('/student/register')
@@ -165,8 +272,7 @@ def create_app():
     def merchant_login_page():
         # 检查系统是否处于维护中
         from models.platform_config import PlatformConfig
-        maintenance_config = PlatformConfig.get_by_key('system_maintenance')
-        is_maintenance = maintenance_config and maintenance_config.config_value.lower() == 'true'
+        is_maintenance = PlatformConfig.is_maintenance()
         return render_template('merchant/login.html', is_maintenance=is_maintenance)
 
     @app.route('/merchant/register')
@@ -237,7 +343,8 @@ def create_app():
         model_modules = [
             'models.student', 'models.merchant', 'models.order', 'models.dish',
             'models.cart', 'models.comment', 'models.complaint', 'models.coupon',
-            'models.platform_config', 'models.address'
+            'models.platform_config', 'models.address', 'models.delivery_fee_ledger',
+            'models.merchant_stats', 'models.outbox', 'models.notification'
         ]
         for m in model_modules:
             try:
@@ -249,6 +356,13 @@ def create_app():
         try:
             # 在同一 db 实例上创建所有表（若不存在）
             db.create_all()
+            # 为已有数据库补充新增字段并回填数据
+            from utils.schema_upgrade import upgrade_schema
+            upgrade_schema()
+            # 校准商户营业状态并建立开店/打烊调度（调度器只在主进程运行）
+            if scheduler.running:
+                from services.merchant_status_service import resync_merchant_status
+                resync_merchant_status()
             from sqlalchemy import inspect
             # print('已创建/存在的数据库表（engine）:', inspect(db.engine).get_table_names())
             
@@ -427,27 +541,24 @@ def create_app():
     def index():
         from models.platform_config import PlatformConfig
         
-        # 获取平台配置信息
-        platform_name = PlatformConfig.get_by_key('platform_name')
-        contact_phone = PlatformConfig.get_by_key('contact_phone')
-        platform_logo = PlatformConfig.get_by_key('platform_logo')
-        contact_email = PlatformConfig.get_by_key('contact_email')
-        platform_desc = PlatformConfig.get_by_key('platform_desc')
-        system_maintenance = PlatformConfig.get_by_key('system_maintenance')
+        # 获取平台配置信息（走进程内配置缓存）
+        platform_name = PlatformConfig.get_value('platform_name')
+        contact_phone = PlatformConfig.get_value('contact_phone')
+        platform_logo = PlatformConfig.get_value('platform_logo')
+        contact_email = PlatformConfig.get_value('contact_email')
+        platform_desc = PlatformConfig.get_value('platform_desc')
         
         # 构建配置字典
         platform_info = {
-            'platform_name': platform_name.config_value if platform_name else '校园餐饮平台',
-            'contact_phone': contact_phone.config_value if contact_phone else '',
-            'platform_logo': platform_logo.config_value if platform_logo else '',
-            'contact_email': contact_email.config_value if contact_email else '',
-            'platform_desc': platform_desc.config_value if platform_desc else '为校园师生提供便捷的餐饮服务'
+            'platform_name': platform_name if platform_name else '校园餐饮平台',
+            'contact_phone': contact_phone if contact_phone else '',
+            'platform_logo': platform_logo if platform_logo else '',
+            'contact_email': contact_email if contact_email else '',
+            'platform_desc': platform_desc if platform_desc else '为校园师生提供便捷的餐饮服务'
         }
         
         # 判断系统是否处于维护中
-        is_maintenance = False
-        if system_maintenance and system_maintenance.config_value.lower() == 'true':
-            is_maintenance = True
+        is_maintenance = PlatformConfig.is_maintenance()
         
         return render_template('home/index.html', platform_info=platform_info, is_maintenance=is_maintenance)
     
@@ -13,6 +13,42 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(basedir, 'campus_food.db')}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite 连接参数（每个新连接执行，置为空字典则使用 SQLite 默认设置）：
+    #   journal_mode=WAL     读写并发：读不阻塞写、写不阻塞读（会生成 .db-wal/.db-shm 文件）
+    #   synchronous=NORMAL   WAL 模式下安全且更快，断电时最多丢失最近提交的事务，不会损坏数据库
+    #   busy_timeout         写锁被占用时等待的毫秒数，代替立即报 database is locked
+    #   mmap_size            内存映射读取的字节数
+    #   cache_size           页缓存大小，负数表示 KB
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -32000))
+    }
+    # 连接池：SQLite 文件数据库使用 QueuePool，连接复用可保留 PRAGMA 设置和页缓存；
+    # 连接数不必多，写入始终串行，WAL 下读请求各自使用连接并发执行
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': 30
+    }
+
+    # 只读库：标记为只读的请求（公共目录接口、管理端列表接口）中的查询使用该连接，写入始终走主库。
+    # 默认以只读方式打开同一个 SQLite 文件（WAL 下与主库写入互不阻塞），MySQL 部署时填写从库地址；置空则不启用
+    SQLALCHEMY_REPLICA_URI = os.getenv(
+        'SQLALCHEMY_REPLICA_URI',
+        f"sqlite:///file:{os.path.join(basedir, 'campus_food.db')}?mode=ro&uri=true"
+    )
+    # 只读库连接池单独配置（未填写的参数沿用 SQLALCHEMY_ENGINE_OPTIONS）
+    SQLALCHEMY_BINDS = {
+        'replica': {
+            'url': SQLALCHEMY_REPLICA_URI,
+            'pool_size': int(os.getenv('DB_REPLICA_POOL_SIZE', 20)),
+            'max_overflow': int(os.getenv('DB_REPLICA_MAX_OVERFLOW', 20))
+        }
+    } if SQLALCHEMY_REPLICA_URI else {}
+
     # Flask配置
     SECRET_KEY = os.getenv('SECRET_KEY','dev-secret-key-please-change-in-production')
     
@@ -35,4 +71,65 @@ class Config:
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
     # 平台服务费
-    PLATFORM_FEE_RATE = 0.05
\ No newline at end of file
+    PLATFORM_FEE_RATE = 0.05
+
+    # 平台配置缓存有效期（秒）：过期后比对配置版本戳，多个worker在该时间内收敛
+    PLATFORM_CONFIG_CACHE_TTL = int(os.getenv('PLATFORM_CONFIG_CACHE_TTL', 5))
+
+    # 发件箱（支付后发券、订单通知等非关键操作在提交后由后台任务处理）
+    OUTBOX_ASYNC = os.getenv('OUTBOX_ASYNC', 'true').lower() == 'true'  # 关闭时在请求内同步处理
+    OUTBOX_POLL_SECONDS = int(os.getenv('OUTBOX_POLL_SECONDS', 2))  # 轮询间隔
+    OUTBOX_BATCH_SIZE = 50  # 每次轮询最多处理的事件数
+    OUTBOX_MAX_ATTEMPTS = 5  # 最大尝试次数，超过后标记为失败
+    OUTBOX_RETRY_SECONDS = 10  # 失败重试的退避基数（秒），按尝试次数递增
+    OUTBOX_LEASE_SECONDS = 60  # 领取事件后的租约时长，超时未完成可被重新领取
+
+    # 日志：默认级别及按模块单独设置的级别（模块名对应 utils.logger.get_logger 的参数）
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_LEVELS = {
+        'payment': os.getenv('LOG_LEVEL_PAYMENT', 'INFO'),
+        'order': os.getenv('LOG_LEVEL_ORDER', 'INFO'),
+        'student': os.getenv('LOG_LEVEL_STUDENT', 'INFO'),
+        'merchant': os.getenv('LOG_LEVEL_MERCHANT', 'INFO'),
+        'outbox': os.getenv('LOG_LEVEL_OUTBOX', 'INFO'),
+        'notification': os.getenv('LOG_LEVEL_NOTIFICATION', 'INFO')
+    }
+
+    # 登录校验时账号可用状态（存在且未被禁用）的缓存时长（秒），0 表示不缓存
+    AUTH_ACTIVE_CACHE_TTL = int(os.getenv('AUTH_ACTIVE_CACHE_TTL', 30))
+
+    # 商户营业状态全量校准间隔（分钟）：平时只在开店/打烊时刻更新，校准用于纳入其他进程修改的营业时间
+    MERCHANT_STATUS_RESYNC_MINUTES = int(os.getenv('MERCHANT_STATUS_RESYNC_MINUTES', 30))
+    # 营业时间修改同步间隔（秒）：调度器所在进程按商户表的营业时间修改时间拉取其他进程（如请求处理进程）的修改
+    MERCHANT_HOURS_SYNC_SECONDS = int(os.getenv('MERCHANT_HOURS_SYNC_SECONDS', 60))
+
+    # 密码校验（bcrypt）线程池：最多同时计算的个数，以及排队+执行中的上限（超过时返回繁忙）
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 32))
+    # 密码尝试限流：时间窗口（秒）内每个账号允许的尝试次数、每个IP允许的失败次数，超过后在计算哈希前拒绝；
+    # PASSWORD_ATTEMPTS_PER_IP 为 0 时不按IP限流
+    PASSWORD_ATTEMPT_WINDOW_SECONDS = 300
+    PASSWORD_ATTEMPTS_PER_ACCOUNT = int(os.getenv('PASSWORD_ATTEMPTS_PER_ACCOUNT', 10))
+    PASSWORD_ATTEMPTS_PER_IP = int(os.getenv('PASSWORD_ATTEMPTS_PER_IP', 50))
+    # 应用前的可信反向代理层数：大于 0 时按 X-Forwarded-For 取真实客户端IP（用于IP限流），直接对外服务时保持 0
+    TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
+
+    # 支付凭证有效期（秒）：支付密码校验通过后签发，有效期内同一设备再次支付可免输支付密码
+    PAY_GRANT_TTL_SECONDS = int(os.getenv('PAY_GRANT_TTL_SECONDS', 300))
+
+    # 商户批量修改订单状态时每次最多处理的订单数
+    ORDER_BATCH_MAX_SIZE = 100
+
+    # 通知队列（订单状态通知写入队列后由后台任务按接收人合并发送）
+    NOTIFICATION_ASYNC = os.getenv('NOTIFICATION_ASYNC', 'true').lower() == 'true'  # 关闭时在请求内直接发送
+    NOTIFICATION_TRANSPORT = os.getenv('NOTIFICATION_TRANSPORT', 'file')  # 发送通道：file（写入本地文件）/console
+    NOTIFICATION_FILE = os.getenv('NOTIFICATION_FILE', os.path.join(basedir, 'logs', 'notifications.jsonl'))
+    NOTIFICATION_POLL_SECONDS = int(os.getenv('NOTIFICATION_POLL_SECONDS', 2))  # 轮询间隔
+    NOTIFICATION_BATCH_SIZE = 200  # 每次轮询最多发送的消息数
+    NOTIFICATION_MAX_ATTEMPTS = 5  # 最大尝试次数，超过后标记为失败
+    NOTIFICATION_RETRY_SECONDS = 10  # 失败重试的退避基数（秒），按尝试次数递增
+    NOTIFICATION_LEASE_SECONDS = 60  # 领取消息后的租约时长，超时未完成可被重新领取
+
+    # 流式 JSON 响应（管理端列表/导出）：每批从数据库读取的行数，以及每次写出的数据块大小（字节）
+    STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 500))
+    STREAM_CHUNK_BYTES = 16 * 1024
@@ -1,9 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_apscheduler import APScheduler
+from utils.db_routing import RoutingSession
 
 # 统一的 SQLAlchemy 实例，模型与 app 都从这里 import db
-db = SQLAlchemy()
+# 会话按请求的只读标记在主库和只读库之间选择连接（见 utils/db_routing.py）
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # 统一的 Bcrypt 实例，用于密码加密
 bcrypt = Bcrypt()
@@ -3,6 +3,11 @@ from extensions import db
 
 class Comment(db.Model):
     __tablename__ = 'comment'
+    __table_args__ = (
+        db.Index('ix_comment_merchant_time', 'merchant_id', 'create_time'),
+        db.Index('ix_comment_student_time', 'student_id', 'create_time'),
+        db.Index('ix_comment_time', 'create_time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     order_id = db.Column(db.Integer, db.ForeignKey('food_order.id'), unique=True, nullable=False, comment='订单ID')
@@ -3,6 +3,9 @@ from extensions import db
 
 class Complaint(db.Model):
     __tablename__ = 'complaint'
+    __table_args__ = (
+        db.Index('ix_complaint_merchant_status', 'merchant_id', 'status'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False, comment='学生ID')
@@ -0,0 +1,70 @@
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import func, update
+from extensions import db
+
+class DeliveryFeeTotal(db.Model):
+    """配送费总收入：流水金额的累计值（单行，id 固定为 1），每追加一条流水都在同一事务中原子累加"""
+    __tablename__ = 'delivery_fee_total'
+
+    id = db.Column(db.Integer, primary_key=True)
+    total = db.Column(db.Numeric(12, 2), nullable=False, default=0, comment='配送费总收入')
+    update_time = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
+
+    ROW_ID = 1
+
+class DeliveryFeeLedger(db.Model):
+    """平台配送费收入流水（只追加不修改，总收入累计在 DeliveryFeeTotal 中）"""
+    __tablename__ = 'delivery_fee_ledger'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    order_id = db.Column(db.Integer, nullable=True, index=True, comment='关联订单ID（期初/调整记录为空）')
+    amount = db.Column(db.Numeric(10, 2), nullable=False, comment='变动金额：收入为正，退款为负')
+    entry_type = db.Column(db.String(20), nullable=False, comment='类型：opening期初/payment支付/refund退款/adjustment管理员调整')
+    remark = db.Column(db.String(200), nullable=True, comment='备注')
+    create_time = db.Column(db.DateTime, default=datetime.now, comment='创建时间')
+
+    def __repr__(self):
+        return f'<DeliveryFeeLedger {self.entry_type} {self.amount}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'amount': float(self.amount) if self.amount is not None else 0.0,
+            'entry_type': self.entry_type,
+            'remark': self.remark,
+            'create_time': self.create_time.isoformat() if self.create_time else None
+        }
+
+    @classmethod
+    def record(cls, amount, entry_type, order_id=None, remark=None, require_non_negative=False):
+        """追加一条流水并原子累加总收入，只加入会话不提交，随调用方的业务事务一起提交
+
+        require_non_negative=True 时，累加后总收入为负则不记账并返回 None（条件写在 UPDATE 中，并发退款不会同时通过）
+        """
+        amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+        stmt = update(DeliveryFeeTotal).where(DeliveryFeeTotal.id == DeliveryFeeTotal.ROW_ID).values(
+            total=DeliveryFeeTotal.total + amount,
+            update_time=datetime.now()
+        )
+        if require_non_negative:
+            stmt = stmt.where(DeliveryFeeTotal.total + amount >= 0)
+        if db.session.execute(stmt).rowcount == 0:
+            return None
+
+        entry = cls(order_id=order_id, amount=amount, entry_type=entry_type, remark=remark)
+        db.session.add(entry)
+        return entry
+
+    @classmethod
+    def get_total(cls):
+        """配送费总收入（读取累计值）"""
+        total = db.session.query(DeliveryFeeTotal.total).filter(DeliveryFeeTotal.id == DeliveryFeeTotal.ROW_ID).scalar()
+        return round(float(total or 0), 2)
+
+    @classmethod
+    def sum_entries(cls):
+        """所有流水金额之和（用于初始化和核对累计值）"""
+        total = db.session.query(func.coalesce(func.sum(cls.amount), 0)).scalar()
+        return Decimal(str(total)).quantize(Decimal('0.01'))
@@ -3,6 +3,10 @@ from extensions import db
 
 class Dish(db.Model):
     __tablename__ = 'dish'
+    __table_args__ = (
+        db.Index('ix_dish_merchant_shelf', 'merchant_id', 'is_shelf'),
+        db.Index('ix_dish_category', 'category'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     merchant_id = db.Column(db.Integer, db.ForeignKey('merchant.id'), nullable=False, comment='商户ID')
@@ -13,6 +17,7 @@ class Dish(db.Model):
     img_url = db.Column(db.String(255), default='default_dish.jpg', comment='图片路径')
     description = db.Column(db.Text, comment='菜品描述')
     is_shelf = db.Column(db.Boolean, default=True, comment='是否上架')
+    sales = db.Column(db.Integer, default=0, nullable=False, comment='销量（已送达订单累计，订单送达时维护）')
     create_time = db.Column(db.DateTime, default=datetime.now, comment='创建时间')
 
     # 关联关系
@@ -33,5 +38,6 @@ class Dish(db.Model):
             'img_url': self.img_url,
             'description': self.description,
             'is_shelf': self.is_shelf,
+            'sales': self.sales or 0,
             'create_time': self.create_time.isoformat() if self.create_time else None
         }
\ No newline at end of file
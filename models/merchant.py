@@ -1,6 +1,7 @@
 from datetime import datetime
 from extensions import db
 from models.comment import Comment
+from utils.business_hours import MAX_LENGTH as BUSINESS_HOURS_MAX_LENGTH
 
 class Merchant(db.Model):
     __tablename__ = 'merchant'
@@ -13,7 +14,8 @@ class Merchant(db.Model):
     logo = db.Column(db.String(255), comment='商铺Logo')
     address = db.Column(db.String(255), nullable=False, comment='店铺地址')
     description = db.Column(db.Text, comment='商铺描述')
-    business_hours = db.Column(db.String(50), comment='营业时间，格式：09:00-22:00')
+    business_hours = db.Column(db.String(BUSINESS_HOURS_MAX_LENGTH), comment='营业时间，格式：09:00-22:00，支持多时段和按星期设置，如 10:00-14:00,17:00-22:00;6-7 休息')
+    hours_update_time = db.Column(db.DateTime, index=True, comment='营业时间修改时间，营业状态调度据此同步其他进程的修改')
     is_open = db.Column(db.Boolean, default=True, comment='商铺状态：True-营业中 False-休息中')
     status = db.Column(db.Integer, default=0, comment='0-待审核 1-已通过 2-已下架')
     service_fee = db.Column(db.Float, default=0.05, comment='平台服务费比例')
@@ -0,0 +1,42 @@
+from extensions import db
+
+# 商户经营数据汇总表：按订单创建时间所在的小时/天分桶，订单状态变化时增量维护，
+# 看板只读汇总行，读取开销只与桶数量有关，与订单历史规模无关
+
+class MerchantHourlyStats(db.Model):
+    """商户小时级经营汇总"""
+    __tablename__ = 'merchant_hourly_stats'
+    __table_args__ = (
+        db.UniqueConstraint('merchant_id', 'bucket', name='uq_merchant_hourly_stats_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    merchant_id = db.Column(db.Integer, db.ForeignKey('merchant.id'), nullable=False, comment='商户ID')
+    bucket = db.Column(db.DateTime, nullable=False, comment='小时桶（整点时间）')
+    order_count = db.Column(db.Integer, nullable=False, default=0, comment='已送达订单数')
+    income = db.Column(db.Float, nullable=False, default=0, comment='已送达订单实付金额合计')
+    dishes_sold = db.Column(db.Integer, nullable=False, default=0, comment='已送达订单售出菜品数')
+    paid_count = db.Column(db.Integer, nullable=False, default=0, comment='已支付订单数')
+    cancel_count = db.Column(db.Integer, nullable=False, default=0, comment='已取消订单数')
+
+    def __repr__(self):
+        return f'<MerchantHourlyStats {self.merchant_id} {self.bucket}>'
+
+class MerchantDailyStats(db.Model):
+    """商户天级经营汇总"""
+    __tablename__ = 'merchant_daily_stats'
+    __table_args__ = (
+        db.UniqueConstraint('merchant_id', 'bucket', name='uq_merchant_daily_stats_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    merchant_id = db.Column(db.Integer, db.ForeignKey('merchant.id'), nullable=False, comment='商户ID')
+    bucket = db.Column(db.Date, nullable=False, comment='日期桶')
+    order_count = db.Column(db.Integer, nullable=False, default=0, comment='已送达订单数')
+    income = db.Column(db.Float, nullable=False, default=0, comment='已送达订单实付金额合计')
+    dishes_sold = db.Column(db.Integer, nullable=False, default=0, comment='已送达订单售出菜品数')
+    paid_count = db.Column(db.Integer, nullable=False, default=0, comment='已支付订单数')
+    cancel_count = db.Column(db.Integer, nullable=False, default=0, comment='已取消订单数')
+
+    def __repr__(self):
+        return f'<MerchantDailyStats {self.merchant_id} {self.bucket}>'
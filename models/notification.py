@@ -0,0 +1,23 @@
+from datetime import datetime
+from extensions import db
+
+class NotificationMessage(db.Model):
+    """通知队列：业务请求只写入待发送消息，由后台任务按接收人合并后通过发送通道发出"""
+    __tablename__ = 'notification_message'
+    __table_args__ = (
+        db.Index('ix_notification_message_status_available', 'status', 'available_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    recipient = db.Column(db.String(50), nullable=False, comment='接收人（手机号）')
+    category = db.Column(db.String(50), nullable=False, default='order_status', comment='消息类型，如 order_status')
+    content = db.Column(db.Text, nullable=False, comment='消息内容')
+    status = db.Column(db.String(20), nullable=False, default='待发送', comment='状态：待发送/发送中/已发送/失败')
+    attempts = db.Column(db.Integer, nullable=False, default=0, comment='已尝试次数')
+    last_error = db.Column(db.Text, nullable=True, comment='最近一次失败原因')
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.now, comment='可发送时间（失败重试时延后）')
+    create_time = db.Column(db.DateTime, default=datetime.now, comment='创建时间')
+    sent_time = db.Column(db.DateTime, nullable=True, comment='发送完成时间')
+
+    def __repr__(self):
+        return f'<NotificationMessage {self.recipient} {self.status}>'
@@ -3,6 +3,11 @@ from extensions import db
 
 class Order(db.Model):
     __tablename__ = 'food_order'  # 修改为非保留关键字
+    __table_args__ = (
+        db.Index('ix_food_order_merchant_status_time', 'merchant_id', 'status', 'create_time'),
+        db.Index('ix_food_order_student_time', 'student_id', 'create_time'),
+        db.Index('ix_food_order_merchant_time', 'merchant_id', 'create_time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     order_no = db.Column(db.String(32), unique=True, nullable=False, comment='订单号')
@@ -49,12 +54,18 @@ class Order(db.Model):
 
 class OrderItem(db.Model):
     __tablename__ = 'food_order_item'  # 修改为非保留关键字
+    __table_args__ = (
+        db.Index('ix_food_order_item_order', 'order_id'),
+        db.Index('ix_food_order_item_dish', 'dish_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     order_id = db.Column(db.Integer, db.ForeignKey('food_order.id'), nullable=False, comment='订单ID')
     dish_id = db.Column(db.Integer, db.ForeignKey('dish.id'), nullable=False, comment='菜品ID')
     quantity = db.Column(db.Integer, nullable=False, comment='数量')
     price = db.Column(db.Float, nullable=False, comment='购买时单价')
+    dish_name = db.Column(db.String(100), nullable=True, comment='购买时菜品名称（快照）')
+    img_url = db.Column(db.String(255), nullable=True, comment='购买时菜品图片（快照）')
 
     def __repr__(self):
         return f'<OrderItem {self.id}>'
@@ -65,7 +76,9 @@ class OrderItem(db.Model):
             'order_id': self.order_id,
             'dish_id': self.dish_id,
             'quantity': self.quantity,
-            'price': self.price
+            'price': self.price,
+            'dish_name': self.dish_name,
+            'img_url': self.img_url
         }
 
 class Refund(db.Model):
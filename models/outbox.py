@@ -0,0 +1,27 @@
+import json
+from datetime import datetime
+from extensions import db
+
+class OutboxEvent(db.Model):
+    """发件箱事件：与业务数据在同一事务中写入，由后台任务在提交后异步处理非关键的后续操作"""
+    __tablename__ = 'outbox_event'
+    __table_args__ = (
+        db.Index('ix_outbox_event_status_available', 'status', 'available_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    event_type = db.Column(db.String(50), nullable=False, comment='事件类型，如 coupon.issue')
+    payload = db.Column(db.Text, nullable=False, comment='事件参数（JSON）')
+    status = db.Column(db.String(20), nullable=False, default='待处理', comment='状态：待处理/处理中/已完成/失败')
+    attempts = db.Column(db.Integer, nullable=False, default=0, comment='已尝试次数')
+    last_error = db.Column(db.Text, nullable=True, comment='最近一次失败原因')
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.now, comment='可处理时间（失败重试时延后）')
+    create_time = db.Column(db.DateTime, default=datetime.now, comment='创建时间')
+    processed_time = db.Column(db.DateTime, nullable=True, comment='处理完成时间')
+
+    def __repr__(self):
+        return f'<OutboxEvent {self.event_type} {self.status}>'
+
+    def get_payload(self):
+        """解析事件参数"""
+        return json.loads(self.payload) if self.payload else {}
@@ -1,5 +1,17 @@
 from extensions import db
 from datetime import datetime
+from sqlalchemy import func
+from config import Config
+import threading
+import time
+
+# 进程内配置缓存：读取时直接命中字典，过期后先比对版本戳再决定是否重新加载
+_config_cache = {
+    'values': None,      # {config_key: config_value}
+    'version': None,     # (最大更新时间, 配置条数)，任一 worker 修改配置都会改变它
+    'expires_at': 0.0
+}
+_config_cache_lock = threading.Lock()
 
 class PlatformConfig(db.Model):
     """平台配置信息模型"""
@@ -32,6 +44,51 @@ class PlatformConfig(db.Model):
         """根据键名获取配置"""
         return cls.query.filter_by(config_key=key).first()
     
+    @classmethod
+    def get_value(cls, key, default=None):
+        """根据键名获取配置值（走进程内缓存，只读场景使用）"""
+        return cls._get_cached_values().get(key, default)
+    
+    @classmethod
+    def get_default_delivery_fee(cls):
+        """获取默认配送费（未配置时为5元）"""
+        value = cls.get_value('default_delivery_fee')
+        return float(value) if value else 5.0
+    
+    @classmethod
+    def is_maintenance(cls):
+        """系统是否处于维护中"""
+        value = cls.get_value('system_maintenance')
+        return bool(value) and value.lower() == 'true'
+    
+    @classmethod
+    def invalidate_cache(cls):
+        """配置修改后调用，使本进程缓存立即失效（其他进程在TTL到期后比对版本戳收敛）"""
+        with _config_cache_lock:
+            _config_cache['values'] = None
+            _config_cache['version'] = None
+            _config_cache['expires_at'] = 0.0
+    
+    @classmethod
+    def _get_cached_values(cls):
+        """返回缓存的配置字典，过期时比对版本戳，版本变化才重新加载全部配置"""
+        values = _config_cache['values']
+        if values is not None and time.monotonic() < _config_cache['expires_at']:
+            return values
+        
+        with _config_cache_lock:
+            # 加锁后再检查一次，避免多个线程同时重新加载
+            if _config_cache['values'] is not None and time.monotonic() < _config_cache['expires_at']:
+                return _config_cache['values']
+            
+            version = tuple(db.session.query(func.max(cls.updated_at), func.count(cls.id)).one())
+            if _config_cache['values'] is None or version != _config_cache['version']:
+                rows = db.session.query(cls.config_key, cls.config_value).all()
+                _config_cache['values'] = {key: value for key, value in rows}
+                _config_cache['version'] = version
+            _config_cache['expires_at'] = time.monotonic() + Config.PLATFORM_CONFIG_CACHE_TTL
+            return _config_cache['values']
+    
     @classmethod
     def get_by_category(cls, category):
         """根据分类获取配置列表"""
@@ -44,22 +101,35 @@ class PlatformConfig(db.Model):
     
     @classmethod
     def get_delivery_fee_earnings(cls):
-        """获取平台配送费收入配置"""
-        config = cls.get_by_key('delivery_fee_earnings')
-        return float(config.config_value) if config else 0.00
+        """获取平台配送费总收入（由配送费流水汇总得到）"""
+        from models.delivery_fee_ledger import DeliveryFeeLedger
+        return DeliveryFeeLedger.get_total()
+    
+    @classmethod
+    def add_delivery_fee_earnings(cls, amount, entry_type, order_id=None, require_non_negative=False):
+        """记录一笔配送费收入变动（退款传负数），追加流水并累加总收入，不提交，由调用方统一提交
+
+        require_non_negative=True 时总收入不足则不记账，返回 None
+        """
+        from models.delivery_fee_ledger import DeliveryFeeLedger
+        return DeliveryFeeLedger.record(amount, entry_type, order_id=order_id, require_non_negative=require_non_negative)
     
     @classmethod
     def update_delivery_fee_earnings(cls, amount):
-        """更新平台配送费收入配置"""
+        """将配送费总收入调整为指定金额（管理员修改），以调整流水的形式记录差额"""
+        from models.delivery_fee_ledger import DeliveryFeeLedger
         # 限制为两位小数
         amount = round(float(amount), 2)
         
+        delta = round(amount - DeliveryFeeLedger.get_total(), 2)
+        if delta:
+            DeliveryFeeLedger.record(delta, 'adjustment', remark='管理员调整配送费总收入')
+        
         config = cls.get_by_key('delivery_fee_earnings')
         if config:
+            # 配置行只保留最近一次调整后的快照，实际总收入以流水为准
             config.config_value = str(amount)
-            db.session.commit()
-            return config
-        return None
+        return config
     
     @classmethod
     def add_wallet_config(cls, key, value, description):
@@ -75,5 +145,6 @@ class PlatformConfig(db.Model):
             )
             db.session.add(new_config)
             db.session.commit()
+            cls.invalidate_cache()
             return new_config
         return existing
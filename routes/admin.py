@@ -5,6 +5,9 @@ from models.merchant import Merchant
 from models.platform_config import PlatformConfig
 from models.coupon import Coupon, UserCoupon
 from extensions import db
+from utils.identity_cache import invalidate_active_flag
+from utils.db_routing import read_only
+from utils.json_stream import stream_json_response
 import os
 from datetime import datetime
 
@@ -52,6 +55,7 @@ def admin_rejected_merchants():
 # 通用商户列表接口（支持按状态过滤）
 @admin_bp.route('/merchants')
 @jwt_required()  # 仅管理员可访问
+@read_only  # 只读接口，查询走只读库
 def get_merchants():
     try:
         # 验证管理员权限
@@ -93,6 +97,7 @@ def get_merchants():
 # 优惠券管理接口 - 获取用户领取的所有优惠券
 @admin_bp.route('/coupons')
 @jwt_required()
+@read_only  # 只读接口，查询走只读库
 def get_coupons():
     try:
         # 验证管理员权限
@@ -104,34 +109,38 @@ def get_coupons():
         if user_type != 'admin':
             return jsonify({'code': 403, 'msg': '权限错误'}), 403
         
-        # 查询所有用户领取的优惠券，关联查询优惠券信息和用户信息
+        # 查询所有用户领取的优惠券，关联查询优惠券信息和用户信息（只取需要的字段，一次查询）
         from models.student import Student
-        user_coupons = UserCoupon.query.join(Coupon).join(Student).all()
-        
-        # 转换为JSON可序列化的列表
-        data = []
-        for user_coupon in user_coupons:
-            # 构建student对象
-            student_obj = {
-                'id': user_coupon.student_id,
-                'name': user_coupon.student.name if hasattr(user_coupon, 'student') and user_coupon.student else ''
+        query = db.session.query(
+            UserCoupon.id,
+            UserCoupon.student_id,
+            UserCoupon.coupon_id,
+            UserCoupon.is_used,
+            UserCoupon.get_time,
+            UserCoupon.use_time,
+            Student.name.label('student_name'),
+            Coupon.coupon_name,
+            Coupon.value,
+            Coupon.min_spend
+        ).join(Coupon, UserCoupon.coupon_id == Coupon.id).join(Student, UserCoupon.student_id == Student.id)
+        
+        def serialize(row):
+            return {
+                'id': row.id,  # UserCoupon的ID
+                'student_id': row.student_id,
+                'student': {'id': row.student_id, 'name': row.student_name or ''},  # 完整的student对象
+                'student_name': row.student_name or '',  # 保持兼容性
+                'coupon_id': row.coupon_id,
+                'coupon_name': row.coupon_name,
+                'discount_amount': row.value,
+                'min_spend': row.min_spend,
+                'is_used': row.is_used,
+                'get_time': row.get_time.strftime('%Y-%m-%d %H:%M:%S'),
+                'use_time': row.use_time.strftime('%Y-%m-%d %H:%M:%S') if row.use_time else ''
             }
-            
-            data.append({
-                'id': user_coupon.id,  # UserCoupon的ID
-                'student_id': user_coupon.student_id,
-                'student': student_obj,  # 完整的student对象
-                'student_name': user_coupon.student.name if hasattr(user_coupon, 'student') and user_coupon.student else '',  # 保持兼容性
-                'coupon_id': user_coupon.coupon_id,
-                'coupon_name': user_coupon.coupon.coupon_name if hasattr(user_coupon, 'coupon') else '',
-                'discount_amount': user_coupon.coupon.value if hasattr(user_coupon, 'coupon') else 0,
-                'min_spend': user_coupon.coupon.min_spend if hasattr(user_coupon, 'coupon') else 0,
-                'is_used': user_coupon.is_used,
-                'get_time': user_coupon.get_time.strftime('%Y-%m-%d %H:%M:%S'),
-                'use_time': user_coupon.use_time.strftime('%Y-%m-%d %H:%M:%S') if user_coupon.use_time else ''
-            })
         
-        return jsonify({'code': 200, 'data': data})
+        # 流式返回，内存占用与优惠券数量无关
+        return stream_json_response(query, serialize)
     except Exception as e:
         return jsonify({'code': 500, 'msg': f'获取优惠券失败：{str(e)}'})
 
@@ -163,6 +172,18 @@ def delete_coupon(user_coupon_id):
         db.session.rollback()
         return jsonify({'code': 500, 'msg': f'删除优惠券失败：{str(e)}'})
 
+# 密码校验线程池运行指标（排队数、执行中数、拒绝次数）
+@admin_bp.route('/metrics/password_hash')
+@jwt_required()
+def get_password_hash_metrics():
+    # 验证管理员权限
+    identity_str = get_jwt_identity()
+    if ':' not in identity_str or identity_str.split(':', 1)[0] != 'admin':
+        return jsonify({'code': 403, 'msg': '权限错误'}), 403
+    
+    from utils.password_utils import get_hash_pool_stats
+    return jsonify({'code': 200, 'msg': '获取成功', 'data': get_hash_pool_stats()})
+
 # 待审核商户列表接口（供前端AJAX调用）
 # 平台设置接口 - 获取所有配置
 @admin_bp.route('/settings')
@@ -186,7 +207,11 @@ def get_platform_settings():
         for config in configs:
             if config.category not in config_dict:
                 config_dict[config.category] = []
-            config_dict[config.category].append(config.to_dict())
+            config_data = config.to_dict()
+            # 配送费总收入取流水汇总值，配置行中的值仅为快照
+            if config.config_key == 'delivery_fee_earnings':
+                config_data['config_value'] = str(PlatformConfig.get_delivery_fee_earnings())
+            config_dict[config.category].append(config_data)
         
         return jsonify({
             'code': 200,
@@ -228,20 +253,23 @@ def update_platform_settings():
             # 查找配置
             config = PlatformConfig.get_by_key(config_key)
             if config:
-                # 对配送费收入进行特殊处理，限制为两位小数
+                # 配送费收入以流水为准，修改时记录一条调整流水
                 if config_key == 'delivery_fee_earnings':
                     try:
-                        # 转换为float后四舍五入到两位小数
-                        config_value = str(round(float(config_value), 2))
-                    except ValueError:
+                        PlatformConfig.update_delivery_fee_earnings(config_value)
+                    except (TypeError, ValueError):
                         # 如果转换失败，跳过更新
                         continue
+                    updated_count += 1
+                    continue
                 
                 # 更新配置值
                 config.config_value = config_value
                 updated_count += 1
         
         db.session.commit()
+        # 配置已修改，使配置缓存失效
+        PlatformConfig.invalidate_cache()
         
         return jsonify({
             'code': 200,
@@ -318,6 +346,8 @@ def upload_logo():
         
         db.session.add(logo_config)
         db.session.commit()
+        # Logo配置已修改，使配置缓存失效
+        PlatformConfig.invalidate_cache()
         
         return jsonify({
             'code': 200, 
@@ -337,6 +367,7 @@ def allowed_file(filename):
 
 @admin_bp.route('/pending_merchants')
 @jwt_required()  # 仅管理员可访问
+@read_only  # 只读接口，查询走只读库
 def get_pending_merchants():
     try:
         # 验证管理员权限
@@ -372,6 +403,7 @@ def get_pending_merchants():
 # 已通过商户列表接口
 @admin_bp.route('/get_approved_merchants')
 @jwt_required()  # 仅管理员可访问
+@read_only  # 只读接口，查询走只读库
 def get_approved_merchants():
     # 复用通用接口，设置状态为1（已通过）
     from flask import request
@@ -382,6 +414,7 @@ def get_approved_merchants():
 # 已驳回商户列表接口
 @admin_bp.route('/get_rejected_merchants')
 @jwt_required()  # 仅管理员可访问
+@read_only  # 只读接口，查询走只读库
 def get_rejected_merchants():
     # 复用通用接口，设置状态为2（已驳回）
     from flask import request
@@ -445,6 +478,9 @@ def delete_merchant():
         # 删除商户
         db.session.delete(merchant)
         db.session.commit()
+        invalidate_active_flag('merchant', merchant.id)
+        from services.merchant_status_service import unschedule_merchant
+        unschedule_merchant(merchant.id)
         return jsonify({'code': 200, 'msg': '商户已删除'})
     except Exception as e:
         db.session.rollback()
@@ -625,6 +661,7 @@ def update_merchant_status():
 # 学生用户管理接口
 @admin_bp.route('/students')
 @jwt_required()  # 仅管理员可访问
+@read_only  # 只读接口，查询走只读库
 def get_students():
     try:
         # 验证管理员权限
@@ -643,20 +680,26 @@ def get_students():
         # 获取过滤参数
         is_active = request.args.get('is_active', type=int)
         
-        # 构建查询
-        query = Student.query
+        # 构建查询（只取列表需要的字段）
+        query = db.session.query(
+            Student.id,
+            Student.student_id,
+            Student.name,
+            Student.phone,
+            Student.avatar,
+            Student.create_time,
+            Student.is_active
+        )
         if is_active is not None:
             # 转换为布尔值
             is_active_bool = is_active == 1
-            query = query.filter_by(is_active=is_active_bool)
+            query = query.filter(Student.is_active == is_active_bool)
         
         # 按注册时间倒序排序
-        students = query.order_by(Student.create_time.desc()).all()
+        query = query.order_by(Student.create_time.desc())
         
-        # 转换为JSON可序列化的列表
-        data = []
-        for student in students:
-            data.append({
+        def serialize(student):
+            return {
                 'id': student.id,
                 'student_id': student.student_id,
                 'name': student.name,
@@ -664,8 +707,10 @@ def get_students():
                 'avatar': student.avatar,
                 'create_time': student.create_time.strftime('%Y-%m-%d %H:%M'),  # 格式化时间
                 'is_active': student.is_active
-            })
-        return jsonify({'code': 200, 'data': data})
+            }
+        
+        # 流式返回，内存占用与学生数量无关
+        return stream_json_response(query, serialize)
     except Exception as e:
         return jsonify({'code': 500, 'msg': f'查询失败：{str(e)}'})
 
@@ -698,6 +743,8 @@ def update_student_status():
         # 更新状态
         student.is_active = is_active
         db.session.commit()
+        # 使登录状态缓存失效，禁用立即生效
+        invalidate_active_flag('student', student.id)
         return jsonify({'code': 200, 'msg': '状态更新成功'})
     except Exception as e:
         db.session.rollback()
@@ -735,6 +782,7 @@ def delete_student():
         # 删除学生
         db.session.delete(student)
         db.session.commit()
+        invalidate_active_flag('student', student.id)
         return jsonify({'code': 200, 'msg': '学生用户删除成功'})
     except Exception as e:
         db.session.rollback()
@@ -743,6 +791,7 @@ def delete_student():
 # 查看投诉
 @admin_bp.get('/complaints')
 @jwt_required()
+@read_only  # 只读接口，查询走只读库
 def get_complaints():
     try:
         # 验证管理员权限
@@ -758,48 +807,34 @@ def get_complaints():
         # 获取状态筛选参数
         status = request.args.get('status', 'all')
         
-        # 查询投诉
+        # 查询投诉，订单号和商家ID从关联订单中一并查出（不再逐条查询订单）
         from models.complaint import Complaint
-        query = Complaint.query.order_by(Complaint.create_time.desc())
+        from models.order import Order
+        query = db.session.query(Complaint, Order.order_no, Order.merchant_id).outerjoin(
+            Order, Complaint.order_id == Order.id
+        ).order_by(Complaint.create_time.desc())
         
         # 根据状态筛选
         if status != 'all':
-            query = query.filter_by(status=status)
+            query = query.filter(Complaint.status == status)
         
-        complaints = query.all()
-        
-        # 转换为JSON可序列化的列表
-        data = []
-        for complaint in complaints:
-            # 获取订单号
-            order_no = ''
-            if complaint.order_id:
-                from models.order import Order
-                order = Order.query.get(complaint.order_id)
-                if order:
-                    order_no = order.order_no
-            
-            # 获取商家ID
-            merchant_id = ''
-            if complaint.order_id:
-                # 从订单中获取商家ID
-                order = Order.query.get(complaint.order_id)
-                if order:
-                    merchant_id = order.merchant_id
-            
-            data.append({
+        def serialize(row):
+            complaint, order_no, merchant_id = row
+            return {
                 'id': complaint.id,
                 'order_id': complaint.order_id,
-                'order_no': order_no,
+                'order_no': order_no or '',
                 'student_id': complaint.student_id,
-                'merchant_id': merchant_id,
+                'merchant_id': merchant_id or '',  # 从订单中获取商家ID
                 'content': complaint.content,
                 'img_urls': complaint.formatted_img_urls,
                 'status': complaint.status,
                 'create_time': complaint.create_time.strftime('%Y-%m-%d %H:%M:%S'),
                 'handle_time': complaint.handle_time.strftime('%Y-%m-%d %H:%M:%S') if complaint.handle_time else None
-            })
-        return jsonify({'code': 200, 'data': data})
+            }
+        
+        # 流式返回，内存占用与投诉数量无关
+        return stream_json_response(query, serialize)
     except Exception as e:
         return jsonify({'code': 500, 'msg': f'查询失败：{str(e)}'})
 
@@ -839,6 +874,7 @@ def delete_complaint(complaint_id):
 # 获取评论列表
 @admin_bp.get('/comments')
 @jwt_required()
+@read_only  # 只读接口，查询走只读库
 def get_comments():
     try:
         # 验证管理员权限
@@ -857,11 +893,23 @@ def get_comments():
         # 查询评论
         from models.comment import Comment
         from models.order import Order
-        query = Comment.query.join(Order, Comment.order_id == Order.id).order_by(Comment.create_time.desc())
-        
-        # 分页查询
-        pagination = query.paginate(page=page, per_page=page_size, error_out=False)
-        comments = pagination.items
+        query = Comment.query.join(Order, Comment.order_id == Order.id)
+        
+        if 'cursor' in request.args:
+            # 游标分页：cursor 传上一页返回的 next_cursor（首页传空值），with_total=1 时额外统计总数
+            from utils.pagination import keyset_paginate
+            page_size = min(max(page_size, 1), 100)
+            total = query.count() if request.args.get('with_total', 0, type=int) else None
+            try:
+                comments, next_cursor = keyset_paginate(
+                    query, Comment.create_time, Comment.id, request.args.get('cursor'), page_size
+                )
+            except ValueError as e:
+                return jsonify({'code': 400, 'msg': str(e)}), 400
+        else:
+            # 按创建时间倒序按页码分页
+            pagination = query.order_by(Comment.create_time.desc()).paginate(page=page, per_page=page_size, error_out=False)
+            comments, total = pagination.items, pagination.total
         
         # 转换为JSON可序列化的列表
         comment_list = []
@@ -881,10 +929,22 @@ def get_comments():
                 'img_urls': comment.formatted_img_urls
             })
         
+        if 'cursor' in request.args:
+            return jsonify({
+                'code': 200,
+                'data': {
+                    'total': total,
+                    'page_size': page_size,
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None,
+                    'items': comment_list
+                }
+            })
+        
         return jsonify({
             'code': 200,
             'data': {
-                'total': pagination.total,
+                'total': total,
                 'page': page,
                 'page_size': page_size,
                 'items': comment_list
@@ -923,9 +983,33 @@ def delete_comment(comment_id):
         db.session.rollback()
         return jsonify({'code': 500, 'msg': f'删除评论失败：{str(e)}'})
 
+def _order_date_filters(start_date, end_date):
+    """把 start_date/end_date（YYYY-MM-DD）转换为订单创建时间的过滤条件，日期非法时抛出 ValueError"""
+    from models.order import Order
+    from datetime import datetime, timedelta
+    
+    try:
+        start_datetime = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        # 结束日期设为当天的23:59:59
+        end_datetime = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1, seconds=-1) if end_date else None
+    except ValueError:
+        raise ValueError('日期格式错误，应为YYYY-MM-DD')
+    
+    # 验证日期范围
+    if start_datetime and end_datetime and end_datetime < start_datetime:
+        raise ValueError('结束日期不能早于开始日期')
+    
+    filters = []
+    if start_datetime:
+        filters.append(Order.create_time >= start_datetime)
+    if end_datetime:
+        filters.append(Order.create_time <= end_datetime)
+    return filters
+
 # 订单统计接口
 @admin_bp.route('/orders')
 @jwt_required()
+@read_only  # 只读接口，查询走只读库
 def get_order_statistics():
     try:
         # 验证管理员权限
@@ -938,77 +1022,46 @@ def get_order_statistics():
         if user_type != 'admin':
             return jsonify({'code': 403, 'msg': '权限错误'}), 403
         
-        # 获取时间参数
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        
-        # 导入Order模型
         from models.order import Order
-        from datetime import datetime, timedelta
-        
-        # 验证日期范围
-        if start_date and end_date:
-            start_datetime = datetime.strptime(start_date, '%Y-%m-%d')
-            end_datetime = datetime.strptime(end_date, '%Y-%m-%d')
-            if end_datetime < start_datetime:
-                return jsonify({'code': 400, 'msg': '结束日期不能早于开始日期'}), 400
-        
-        # 构建查询
-        query = Order.query
-        
-        # 添加时间过滤
-        if start_date:
-            start_datetime = datetime.strptime(start_date, '%Y-%m-%d')
-            query = query.filter(Order.create_time >= start_datetime)
-        if end_date:
-            # 结束日期设为当天的23:59:59
-            end_datetime = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1, seconds=-1)
-            query = query.filter(Order.create_time <= end_datetime)
-        
-        # 执行查询
-        orders = query.all()
+        from sqlalchemy import func
         
-        # 统计数据
-        total_orders = len(orders)
-        pending_orders = sum(1 for order in orders if order.status == '待接单')  # 待处理订单数：待接单订单的数量
-        processing_orders = sum(1 for order in orders if order.status == '待配送')  # 处理中订单数：配送中的订单数量（对应"待配送"状态）
-        delivered_orders = sum(1 for order in orders if order.status == '已送达')  # 已送达订单数
-        cancelled_orders = sum(1 for order in orders if order.status == '已取消')
-        total_sales = sum(order.pay_amount for order in orders if order.status == '已送达')  # 总销售额：已送达订单的实付金额总和
-        
-        # 按状态分组统计
-        status_count = {}
-        for order in orders:
-            status_count[order.status] = status_count.get(order.status, 0) + 1
+        # 解析时间范围
+        try:
+            date_filters = _order_date_filters(request.args.get('start_date'), request.args.get('end_date'))
+        except ValueError as e:
+            return jsonify({'code': 400, 'msg': str(e)}), 400
         
-
+        # 按状态分组统计订单数和实付金额（一次查询）
+        status_rows = db.session.query(
+            Order.status,
+            func.count(Order.id),
+            func.coalesce(func.sum(Order.pay_amount), 0)
+        ).filter(*date_filters).group_by(Order.status).all()
         
-        # 按商户统计销售
-        merchant_sales = {}
-        for order in orders:
-            if order.status == '已送达':
-                merchant_sales[order.merchant_id] = merchant_sales.get(order.merchant_id, 0) + order.pay_amount
+        status_count = {status: count for status, count, _ in status_rows}
+        status_amount = {status: float(amount) for status, _, amount in status_rows}
         
-        # 获取订单列表（用于表格展示）
-        order_list = []
-        for order in orders:
-            order_list.append({
-                'id': order.id,
-                'order_no': order.order_no,
-                'student_id': order.student_id,
-                'merchant_id': order.merchant_id,
-                'total_amount': order.total_amount,
-                'pay_amount': order.pay_amount,
-                'discount_amount': order.discount_amount,
-
-                'status': order.status,
-                'create_time': order.create_time.strftime('%Y-%m-%d %H:%M:%S')
-            })
+        # 统计数据
+        total_orders = sum(status_count.values())
+        pending_orders = status_count.get('待接单', 0)  # 待处理订单数：待接单订单的数量
+        processing_orders = status_count.get('待配送', 0)  # 处理中订单数：配送中的订单数量（对应"待配送"状态）
+        delivered_orders = status_count.get('已送达', 0)  # 已送达订单数
+        cancelled_orders = status_count.get('已取消', 0)
+        total_sales = status_amount.get('已送达', 0)  # 总销售额：已送达订单的实付金额总和
+        
+        # 按商户统计销售（已送达订单）
+        merchant_rows = db.session.query(
+            Order.merchant_id,
+            func.sum(Order.pay_amount)
+        ).filter(
+            Order.status == '已送达', *date_filters
+        ).group_by(Order.merchant_id).all()
+        merchant_sales = {merchant_id: float(amount or 0) for merchant_id, amount in merchant_rows}
         
         # 计算平均订单价值：总销售额除以已送达订单数
         avg_order_value = round(total_sales / delivered_orders, 2) if delivered_orders > 0 else 0
         
-        # 返回统计数据
+        # 返回统计数据（订单明细通过 /orders/list 分页获取）
         return jsonify({
             'code': 200,
             'data': {
@@ -1022,8 +1075,85 @@ def get_order_statistics():
                     'average_order_value': avg_order_value  # 平均订单价值：总销售额除以已送达订单数
                 },
                 'status_count': status_count,
-                'merchant_sales': merchant_sales,
-                'orders': order_list
+                'merchant_sales': merchant_sales
+            }
+        })
+    except Exception as e:
+        return jsonify({'code': 500, 'msg': f'查询失败：{str(e)}'})
+
+# 订单明细列表接口（键集分页，按创建时间倒序）
+@admin_bp.route('/orders/list')
+@jwt_required()
+@read_only  # 只读接口，查询走只读库
+def get_order_list():
+    try:
+        # 验证管理员权限
+        identity_str = get_jwt_identity()
+        if ':' not in identity_str:
+            return jsonify({'code': 403, 'msg': '权限错误'}), 403
+        
+        user_type, user_id = identity_str.split(':', 1)
+        if user_type != 'admin':
+            return jsonify({'code': 403, 'msg': '权限错误'}), 403
+        
+        from models.order import Order
+        from utils.pagination import keyset_paginate
+        
+        # 获取分页参数：cursor 为上一页返回的 next_cursor，首页不传；stream=1 时导出全部
+        cursor = request.args.get('cursor')
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        status = request.args.get('status')
+        
+        try:
+            date_filters = _order_date_filters(request.args.get('start_date'), request.args.get('end_date'))
+        except ValueError as e:
+            return jsonify({'code': 400, 'msg': str(e)}), 400
+        
+        # 只查询表格需要的字段
+        query = db.session.query(
+            Order.id,
+            Order.order_no,
+            Order.student_id,
+            Order.merchant_id,
+            Order.total_amount,
+            Order.pay_amount,
+            Order.discount_amount,
+            Order.status,
+            Order.create_time
+        ).filter(*date_filters)
+        if status:
+            query = query.filter(Order.status == status)
+        
+        def serialize(order):
+            return {
+                'id': order.id,
+                'order_no': order.order_no,
+                'student_id': order.student_id,
+                'merchant_id': order.merchant_id,
+                'total_amount': order.total_amount,
+                'pay_amount': order.pay_amount,
+                'discount_amount': order.discount_amount,
+                'status': order.status,
+                'create_time': order.create_time.strftime('%Y-%m-%d %H:%M:%S') if order.create_time else None
+            }
+        
+        if request.args.get('stream', 0, type=int):
+            # 导出：stream=1 时按创建时间倒序流式返回全部符合条件的订单（忽略 cursor/limit），内存占用与订单数量无关
+            return stream_json_response(query.order_by(Order.create_time.desc(), Order.id.desc()), serialize)
+        
+        try:
+            rows, next_cursor = keyset_paginate(query, Order.create_time, Order.id, cursor, limit)
+        except ValueError as e:
+            return jsonify({'code': 400, 'msg': str(e)}), 400
+        
+        order_list = [serialize(order) for order in rows]
+        
+        return jsonify({
+            'code': 200,
+            'data': {
+                'orders': order_list,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
             }
         })
     except Exception as e:
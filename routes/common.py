@@ -1,8 +1,12 @@
 from flask import Blueprint, jsonify, request
 from models.dish import Dish
 from models.merchant import Merchant
+from extensions import db
+from utils.db_routing import use_read_only
 
 common_bp = Blueprint('common', __name__)
+# 公共接口只有查询，整个蓝图的查询走只读库
+common_bp.before_request(use_read_only)
 
 # 获取分类列表
 @common_bp.get('/categories')
@@ -16,61 +20,54 @@ def get_categories():
     ]
     return jsonify({'code': 200, 'data': categories})
 
-# 获取商户列表
+# 获取商户列表（支持 page/page_size 分页和 is_open 营业状态筛选）
 @common_bp.get('/merchants')
 def get_merchants():
-    from models.order import Order, OrderItem
+    from services.merchant_service import list_merchants
     
-    merchants = Merchant.query.filter_by(status=1).all()  # 只显示已通过审核的
-    data = []
+    page = request.args.get('page', type=int)
+    page_size = request.args.get('page_size', 10, type=int)
+    if page is not None and page < 1:
+        page = 1
+    if page_size < 1:
+        page_size = 10
     
-    for m in merchants:
-        # 计算商户所有菜品的总售出量
-        total_sales = 0
-        # 1. 获取商户的所有菜品
-        dishes = Dish.query.filter_by(merchant_id=m.id).all()
-        if dishes:
-            # 2. 获取所有菜品的ID
-            dish_ids = [d.id for d in dishes]
-            # 3. 查询这些菜品的所有订单项（已送达订单）
-            order_items = OrderItem.query.join(Order).filter(
-                OrderItem.dish_id.in_(dish_ids),
-                Order.status == '已送达'
-            ).all()
-            # 4. 计算总数量
-            total_sales = sum(item.quantity for item in order_items)
-        
+    # is_open 参数：1/true 只看营业中，0/false 只看休息中，不传则不筛选
+    is_open = request.args.get('is_open')
+    if is_open is not None and is_open != '':
+        is_open = is_open.lower() in ['1', 'true', 'yes']
+    else:
+        is_open = None
+    
+    # 一次分组查询得到所有商户及其总售出量
+    rows, total = list_merchants(page=page, page_size=page_size, is_open=is_open)
+    
+    data = []
+    for m in rows:
         data.append({
             'id': m.id,
             'name': m.merchant_name,
             'address': m.address,
             'contact_phone': m.contact_phone,
             'logo': m.logo if m.logo else 'uploads/merchant/default.svg',  # 添加默认Logo
-            'description': getattr(m, 'description', ''),  # 添加描述字段
-            'total_sales': total_sales  # 修改为总售出量
+            'description': m.description or '',  # 添加描述字段
+            'is_open': m.is_open,
+            'total_sales': int(m.total_sales or 0)  # 总售出量（已送达订单）
         })
     
-    return jsonify({'code': 200, 'data': data})
+    response = {'code': 200, 'data': data}
+    if page is not None:
+        response.update({'total': total, 'page': page, 'page_size': page_size})
+    return jsonify(response)
 
 # 获取菜品列表
 @common_bp.get('/dishes/<int:merchant_id>')
 def get_dishes(merchant_id):
-    from models.order import Order, OrderItem
-    
+    # 销量直接读取菜品表上维护的计数字段，无需逐个菜品统计订单项
     dishes = Dish.query.filter_by(merchant_id=merchant_id).all()
     data = []
     
     for d in dishes:
-        # 计算菜品的总售出量
-        sales = 0
-        # 查询该菜品的所有订单项（已送达订单）
-        order_items = OrderItem.query.join(Order).filter(
-            OrderItem.dish_id == d.id,
-            Order.status == '已送达'
-        ).all()
-        # 计算总数量
-        sales = sum(item.quantity for item in order_items)
-        
         data.append({
                 'id': d.id,
                 'name': d.dish_name,
@@ -79,7 +76,7 @@ def get_dishes(merchant_id):
                 'category': d.category,
                 'img_url': d.img_url,
                 'description': d.description,
-                'sales': sales,  # 添加总售出量
+                'sales': d.sales or 0,  # 总售出量（已送达订单）
                 'is_shelf': d.is_shelf  # 添加上下架状态
             })
     
@@ -140,79 +137,53 @@ def get_dishes_by_category():
     if not category:
         return jsonify({'code': 400, 'msg': '缺少category参数'}), 400
     
-    # 查询该类别下的所有菜品（包括下架）
-    dishes = Dish.query.filter_by(category=category).all()
-    
-    from models.order import Order, OrderItem
+    # 查询该类别下的所有菜品（包括下架），一次关联查询带出商户名称
+    rows = db.session.query(Dish, Merchant.merchant_name).join(
+        Merchant, Merchant.id == Dish.merchant_id
+    ).filter(Dish.category == category).all()
     
     # 构建菜品列表，包含商户名称
     data = []
-    for dish in dishes:
-        # 获取对应的商户信息
-        merchant = Merchant.query.get(dish.merchant_id)
-        if merchant:
-            # 计算菜品的总售出量
-            sales = 0
-            # 查询该菜品的所有订单项（已送达订单）
-            order_items = OrderItem.query.join(Order).filter(
-                OrderItem.dish_id == dish.id,
-                Order.status == '已送达'
-            ).all()
-            # 计算总数量
-            sales = sum(item.quantity for item in order_items)
-            
-            data.append({
-                'id': dish.id,
-                'name': dish.dish_name,
-                'price': dish.price,
-                'stock': dish.stock,  # 添加库存信息
-                'category': dish.category,
-                'img_url': dish.img_url,
-                'description': dish.description,
-                'merchant_id': dish.merchant_id,
-                'merchant_name': merchant.merchant_name,
-                'sales': sales,  # 计算总售出量
-                'is_shelf': dish.is_shelf  # 添加上下架状态
-            })
+    for dish, merchant_name in rows:
+        data.append({
+            'id': dish.id,
+            'name': dish.dish_name,
+            'price': dish.price,
+            'stock': dish.stock,  # 添加库存信息
+            'category': dish.category,
+            'img_url': dish.img_url,
+            'description': dish.description,
+            'merchant_id': dish.merchant_id,
+            'merchant_name': merchant_name,
+            'sales': dish.sales or 0,  # 总售出量（已送达订单）
+            'is_shelf': dish.is_shelf  # 添加上下架状态
+        })
     
     return jsonify({'code': 200, 'data': data})
 
 # 获取所有菜品
 @common_bp.get('/all_dishes')
 def get_all_dishes():
-    # 查询所有菜品（包括下架）
-    dishes = Dish.query.all()
-    
-    from models.order import Order, OrderItem
+    # 查询所有菜品（包括下架），一次关联查询带出商户名称
+    rows = db.session.query(Dish, Merchant.merchant_name).join(
+        Merchant, Merchant.id == Dish.merchant_id
+    ).all()
     
     # 构建菜品列表，包含商户名称
     data = []
-    for dish in dishes:
-        # 获取对应的商户信息
-        merchant = Merchant.query.get(dish.merchant_id)
-        if merchant:
-            # 计算菜品的总售出量
-            sales = 0
-            # 查询该菜品的所有订单项（已送达订单）
-            order_items = OrderItem.query.join(Order).filter(
-                OrderItem.dish_id == dish.id,
-                Order.status == '已送达'
-            ).all()
-            # 计算总数量
-            sales = sum(item.quantity for item in order_items)
-            
-            data.append({
-                'id': dish.id,
-                'name': dish.dish_name,
-                'price': dish.price,
-                'stock': dish.stock,  # 添加库存信息
-                'category': dish.category,
-                'img_url': dish.img_url,
-                'description': dish.description,
-                'merchant_id': dish.merchant_id,
-                'merchant_name': merchant.merchant_name,
-                'sales': sales,  # 计算总售出量
-                'is_shelf': dish.is_shelf  # 添加上下架状态
-            })
+    for dish, merchant_name in rows:
+        data.append({
+            'id': dish.id,
+            'name': dish.dish_name,
+            'price': dish.price,
+            'stock': dish.stock,  # 添加库存信息
+            'category': dish.category,
+            'img_url': dish.img_url,
+            'description': dish.description,
+            'merchant_id': dish.merchant_id,
+            'merchant_name': merchant_name,
+            'sales': dish.sales or 0,  # 总售出量（已送达订单）
+            'is_shelf': dish.is_shelf  # 添加上下架状态
+        })
     
-    return jsonify({'code': 200, 'data': data})
\ No newline at end of file
+    return jsonify({'code': 200, 'data': data})
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for
+from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for, g
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.merchant import Merchant
 from models.dish import Dish
@@ -7,11 +7,18 @@ from models.coupon import Coupon
 from extensions import db, bcrypt
 from sqlalchemy import func
 from utils.file_utils import save_file
-from services.auth_service import merchant_register, merchant_login
+from services.auth_service import merchant_register, merchant_login, verify_password_attempt
+from utils.password_utils import PasswordCheckRejected
 from utils.jwt_utils import generate_token
 from datetime import datetime, timedelta
+from utils.logger import get_logger
+from config import Config
+from utils.identity_cache import get_active_flag, set_active_flag
+from utils.business_hours import BusinessHours, parse_business_hours, MAX_LENGTH as BUSINESS_HOURS_MAX_LENGTH
 import os
 
+logger = get_logger('merchant')
+
 merchant_bp = Blueprint('merchant', __name__)
 
 # 检查商户是否已登录的装饰器（页面路由用）
@@ -23,122 +30,71 @@ def login_required(f):
     decorated_function.__name__ = f.__name__
     return decorated_function
 
+def _merchant_id_candidates():
+    """依次给出 session 和 JWT 中的商户ID"""
+    merchant_id = session.get('merchant_id')
+    if merchant_id is not None:
+        yield int(merchant_id)
+    try:
+        from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+        if identity and ':' in identity:
+            user_type, user_id = identity.split(':', 1)
+            if user_type == 'merchant':
+                yield int(user_id)
+    except Exception as e:
+        # 记录异常但不暴露具体错误信息
+        logger.warning('认证过程中发生异常', extra={'fields': {'error': str(e), 'path': request.path}})
+
 # 检查商户是否已登录的装饰器（API路由用）
+# 解析出的商户ID保存在 g.merchant_id，查询过的商户对象保存在 g.current_merchant，
+# 视图中通过 get_current_merchant() 获取，同一请求内不再重复查询
 def api_login_required(f):
     def decorated_function(*args, **kwargs):
-        merchant = None
-        try:
-            # print(f"[DEBUG] Session内容: {dict(session)}")
-            # 首先检查session中是否有登录信息
-            if 'merchant_id' in session:
-                # print(f"[DEBUG] Session中有merchant_id: {session['merchant_id']}")
-                merchant = Merchant.query.get(session['merchant_id'])
-                # print(f"[DEBUG] 根据merchant_id查询到商户: {merchant}")
-                if merchant:
-                    return f(*args, **kwargs)
+        for merchant_id in _merchant_id_candidates():
+            # 商户是否存在优先读缓存，未命中时才查询商户表
+            if not get_active_flag('merchant', merchant_id):
+                merchant = Merchant.query.get(merchant_id)
+                if not merchant:
+                    continue
+                set_active_flag('merchant', merchant_id, True)
+                g.current_merchant = merchant
             
-            # 然后检查JWT token
-            from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
-            verify_jwt_in_request(optional=True)
-            identity = get_jwt_identity()
-            # print(f"[DEBUG] JWT identity: {identity}")
-            
-            if identity and ':' in identity:
-                user_type, user_id = identity.split(':', 1)
-                if user_type == 'merchant':
-                    merchant = Merchant.query.get(int(user_id))
-                    if merchant:
-                        # 将merchant_id添加到session中以便后续使用
-                        session['merchant_id'] = int(user_id)
-                        return f(*args, **kwargs)
-        except Exception as e:
-            # 记录异常但不暴露具体错误信息
-            print(f"[DEBUG] 认证过程中发生异常: {str(e)}")
-            pass
+            g.merchant_id = merchant_id
+            # 将merchant_id添加到session中以便后续使用
+            session['merchant_id'] = merchant_id
+            return f(*args, **kwargs)
         
         return jsonify({'code': 401, 'msg': '未登录'}), 401
     decorated_function.__name__ = f.__name__
     return decorated_function
 
-def calculate_merchant_status(merchant):
-    """根据当前时间和营业时间计算商户的营业状态"""
-    if not merchant or not merchant.business_hours:
-        print(f"商户信息不完整或无营业时间设置，ID: {merchant.id if merchant else None}")
+def calculate_merchant_status(merchant, now=None):
+    """根据当前时间（或指定的 now）和营业时间计算商户的营业状态，只计算不修改商户对象
+
+    未设置营业时间或格式错误时按营业中处理
+    """
+    if not merchant:
         return True  # 默认营业中
-    
-    try:
-        # 解析营业时间
-        if '-' in merchant.business_hours:
-            open_time_str, close_time_str = merchant.business_hours.split('-')
-            
-            # 验证时间格式
-            if ':' not in open_time_str or ':' not in close_time_str:
-                raise ValueError("时间格式不正确，应为HH:MM")
-                
-            # 获取当前时间
-            now = datetime.now()
-            
-            # 解析开始和结束时间
-            open_hour, open_minute = map(int, open_time_str.split(':'))
-            close_hour, close_minute = map(int, close_time_str.split(':'))
-            
-            # 验证时间范围
-            if not (0 <= open_hour <= 23) or not (0 <= open_minute <= 59) or \
-               not (0 <= close_hour <= 23) or not (0 <= close_minute <= 59):
-                raise ValueError("时间超出有效范围")
-                
-            # 创建今天的营业时间对象
-            open_time = datetime(now.year, now.month, now.day, open_hour, open_minute)
-            close_time = datetime(now.year, now.month, now.day, close_hour, close_minute)
-            
-            # 处理跨天情况
-            if close_time < open_time:
-                if now >= open_time or now <= close_time:
-                    return True
-                else:
-                    return False
-            else:
-                if open_time <= now <= close_time:
-                    return True
-                else:
-                    return False
-        else:
-            raise ValueError("营业时间格式不正确，应为开始时间-结束时间")
-    except Exception as e:
-        print(f"计算营业状态时出错: {str(e)}")
-        return True  # 出错时默认营业中
+    from services.merchant_status_service import is_open_at
+    return is_open_at(parse_business_hours(merchant.business_hours), now or datetime.now())
 
 # 获取当前登录商户信息
 def get_current_merchant():
-    """获取当前登录的商户，并自动更新其营业状态"""
-    merchant = None
-    if 'merchant_id' in session:
-        merchant = Merchant.query.get(session['merchant_id'])
-    else:
-        try:
-            # 尝试从JWT token获取商户ID
-            from flask_jwt_extended import get_jwt_identity
-            identity = get_jwt_identity()
-            if identity and isinstance(identity, str) and ':' in identity:
-                user_type, user_id = identity.split(':', 1)
-                if user_type == 'merchant':
-                    merchant = Merchant.query.get(int(user_id))
-        except Exception:
-            # JWT获取失败时不影响正常流程
-            pass
-    
-    # 自动更新营业状态
-    if merchant:
-        new_status = calculate_merchant_status(merchant)
-        # 只有状态发生变化时才更新数据库，减少不必要的数据库操作
-        if merchant.is_open != new_status:
-            merchant.is_open = new_status
-            try:
-                db.session.commit()
-                print(f"自动更新商户{merchant.merchant_name}的营业状态为: {new_status}")
-            except Exception as e:
-                print(f"更新营业状态到数据库失败: {str(e)}")
-                db.session.rollback()
+    """获取当前登录的商户（同一请求内只查询一次）
+
+    只读不写：营业状态由定时任务维护，需要实时状态时调用 calculate_merchant_status 计算
+    """
+    merchant = g.get('current_merchant')
+    if merchant is None:
+        merchant_id = g.get('merchant_id')
+        if merchant_id is None:
+            # 未经过 api_login_required 的调用，从 session/JWT 中解析
+            merchant_id = next(_merchant_id_candidates(), None)
+        if merchant_id is not None:
+            merchant = Merchant.query.get(merchant_id)
+            g.current_merchant = merchant
     
     return merchant
 
@@ -201,8 +157,7 @@ def merchant_profile():
 def register():
     # 检查系统是否处于维护中
     from models.platform_config import PlatformConfig
-    maintenance_config = PlatformConfig.get_by_key('system_maintenance')
-    if maintenance_config and maintenance_config.config_value.lower() == 'true':
+    if PlatformConfig.is_maintenance():
         return jsonify({'code': 403, 'msg': '系统正在维护中'}), 200
     # 从表单中获取字段（支持 multipart/form-data 上传）
     form = request.form
@@ -262,8 +217,7 @@ def register():
 def api_login():
     # 检查系统是否处于维护中
     from models.platform_config import PlatformConfig
-    maintenance_config = PlatformConfig.get_by_key('system_maintenance')
-    if maintenance_config and maintenance_config.config_value.lower() == 'true':
+    if PlatformConfig.is_maintenance():
         return jsonify({'code': 403, 'msg': '系统正在维护中'}), 200
     
     data = request.get_json()
@@ -272,43 +226,20 @@ def api_login():
     if not phone or not password:
         return jsonify({'code': 400, 'msg': '请输入手机号和密码'}), 400
 
-    result = merchant_login(phone, password)
+    result = merchant_login(phone, password, ip=request.remote_addr)
     if not result or isinstance(result, dict) and result.get('error'):
         msg = result.get('error') if isinstance(result, dict) else '账号或密码错误'
-        return jsonify({'code': 401, 'msg': msg}), 401
+        code = result.get('code', 401) if isinstance(result, dict) else 401
+        return jsonify({'code': code, 'msg': msg}), code
     
     # 登录成功后设置session，这样get_current_merchant才能正常工作
     merchant = Merchant.query.filter_by(contact_phone=phone).first()
     if merchant:
         session['merchant_id'] = merchant.id
         
-        # 根据当前时间和营业时间设置is_open值
-        if merchant.business_hours:
-            try:
-                # 解析营业时间，格式：09:00-22:00
-                open_time_str, close_time_str = merchant.business_hours.split('-')
-                # 获取当前时间
-                now = datetime.now()
-                # 解析开始和结束时间
-                open_hour, open_minute = map(int, open_time_str.split(':'))
-                close_hour, close_minute = map(int, close_time_str.split(':'))
-                # 创建今天的营业时间对象
-                open_time = datetime(now.year, now.month, now.day, open_hour, open_minute)
-                close_time = datetime(now.year, now.month, now.day, close_hour, close_minute)
-                # 判断当前时间是否在营业时间内
-                if open_time <= now <= close_time:
-                    merchant.is_open = True
-                else:
-                    merchant.is_open = False
-                # 保存到数据库
-                db.session.commit()
-                # 更新返回结果中的is_open状态
-                if isinstance(result, dict):
-                    result['is_open'] = merchant.is_open
-            except Exception as e:
-                # 如果解析失败，保持原有状态
-                print(f"解析营业时间失败: {str(e)}")
-                db.session.rollback()
+        # 返回按营业时间实时计算的营业状态（登录不写库，数据库中的状态由定时任务维护）
+        if isinstance(result, dict):
+            result['is_open'] = calculate_merchant_status(merchant)
 
     return jsonify({'code': 200, 'msg': '登录成功', 'data': result})
 
@@ -317,8 +248,7 @@ def api_login():
 def merchant_web_login():
     # 检查系统是否处于维护中
     from models.platform_config import PlatformConfig
-    maintenance_config = PlatformConfig.get_by_key('system_maintenance')
-    if maintenance_config and maintenance_config.config_value.lower() == 'true':
+    if PlatformConfig.is_maintenance():
         return jsonify({'code': 403, 'msg': '系统正在维护中'}), 200
     
     data = request.get_json()
@@ -330,36 +260,18 @@ def merchant_web_login():
     
     merchant = Merchant.query.filter_by(contact_phone=contact_phone).first()
     
-    if merchant and bcrypt.check_password_hash(merchant.password, password):
+    # 校验密码（尝试次数过多或密码线程池繁忙时直接拒绝）
+    try:
+        password_ok = merchant is not None and verify_password_attempt(
+            f'merchant:{merchant.id}', password, merchant.password, request.remote_addr)
+    except PasswordCheckRejected as e:
+        return jsonify({'code': e.code, 'msg': e.msg}), e.code
+    
+    if password_ok:
         # 检查商户状态
         if merchant.status != 1:
             return jsonify({'code': 403, 'msg': '账号未审核通过或已下架'})
         
-        # 根据当前时间和营业时间设置is_open值
-        if merchant.business_hours:
-            try:
-                # 解析营业时间，格式：09:00-22:00
-                open_time_str, close_time_str = merchant.business_hours.split('-')
-                # 获取当前时间
-                now = datetime.now()
-                # 解析开始和结束时间
-                open_hour, open_minute = map(int, open_time_str.split(':'))
-                close_hour, close_minute = map(int, close_time_str.split(':'))
-                # 创建今天的营业时间对象
-                open_time = datetime(now.year, now.month, now.day, open_hour, open_minute)
-                close_time = datetime(now.year, now.month, now.day, close_hour, close_minute)
-                # 判断当前时间是否在营业时间内
-                if open_time <= now <= close_time:
-                    merchant.is_open = True
-                else:
-                    merchant.is_open = False
-                # 保存到数据库
-                db.session.commit()
-            except Exception as e:
-                # 如果解析失败，保持原有状态
-                print(f"解析营业时间失败: {str(e)}")
-                db.session.rollback()
-            
         token = generate_token(merchant.id, 'merchant')
         session['merchant_id'] = merchant.id
         session['merchant_token'] = token
@@ -373,7 +285,7 @@ def merchant_web_login():
                     'name': merchant.merchant_name,
                     'status': merchant.status,
                     'logo': merchant.logo,  # 添加logo字段
-                    'is_open': merchant.is_open  # 返回当前营业状态
+                    'is_open': calculate_merchant_status(merchant)  # 按营业时间实时计算的营业状态
                 }
             }
         })
@@ -385,8 +297,7 @@ def merchant_web_login():
 def merchant_web_register():
     # 检查系统是否处于维护中
     from models.platform_config import PlatformConfig
-    maintenance_config = PlatformConfig.get_by_key('system_maintenance')
-    if maintenance_config and maintenance_config.config_value.lower() == 'true':
+    if PlatformConfig.is_maintenance():
         return jsonify({'success': False, 'message': '系统正在维护中'}), 200
     data = request.get_json()
     username = data.get('username')
@@ -436,107 +347,13 @@ def get_merchant_statistics():
     if not merchant:
         return jsonify({'success': False, 'message': '未登录'})
     
-    from datetime import datetime, timedelta
-    from sqlalchemy import func
+    from services.statistics_service import get_merchant_statistics as build_statistics
     
     # 获取时间范围参数，默认为1天
     days = request.args.get('days', 1, type=int)
     
-    # 计算开始时间
-    today = datetime.now()
-    today_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
-    
-    # 近1天指的是今天（从今天凌晨0点开始）
-    # 近N天指的是从N-1天前的凌晨0点到现在（例如近3天是前天、昨天、今天）
-    start_time = today_start - timedelta(days=days-1)
-    
-    # 订单数（已送达）
-    total_orders = Order.query.filter_by(
-        merchant_id=merchant.id,
-        status='已送达'
-    ).filter(Order.create_time >= start_time).count()
-    
-    # 收入（已送达订单的实付金额总和）
-    total_income = db.session.query(func.sum(Order.pay_amount)).filter_by(
-        merchant_id=merchant.id,
-        status='已送达'
-    ).filter(Order.create_time >= start_time).scalar() or 0
-    
-    # 待处理订单数（待接单和制作中）
-    pending_orders = Order.query.filter_by(
-        merchant_id=merchant.id
-    ).filter(Order.status.in_(['待接单', '制作中', '待配送'])).count()
-    
-    # 售出菜品数（统计指定时间范围内所有已送达订单中的菜品总数）
-    total_dishes_sold = db.session.query(func.sum(OrderItem.quantity)).join(
-        Order, Order.id == OrderItem.order_id
-    ).filter(
-        Order.merchant_id == merchant.id,
-        Order.status == '已送达',
-        Order.create_time >= start_time
-    ).scalar() or 0
-    
-    # 今日订单数（今天0点至今）
-    today_orders = Order.query.filter_by(
-        merchant_id=merchant.id,
-        status='已送达'
-    ).filter(Order.create_time >= today_start).count()
-    
-    # 今日收入（今天0点至今）
-    today_income = db.session.query(func.sum(Order.pay_amount)).filter_by(
-        merchant_id=merchant.id,
-        status='已送达'
-    ).filter(Order.create_time >= today_start).scalar() or 0
-    
-    # 在售菜品数（状态为上架的菜品）
-    active_dishes = Dish.query.filter_by(
-        merchant_id=merchant.id,
-        is_shelf=True  # True表示在售
-    ).count()
-    
-    # 小时级销售数据和订单数
-    hourly_sales = []
-    hourly_orders = []
-    
-    # 获取今日每小时的销售数据和订单数
-    for hour in range(24):
-        # 计算当前小时的开始和结束时间
-        hour_start = today_start + timedelta(hours=hour)
-        hour_end = hour_start + timedelta(hours=1)
-        
-        # 查询当前小时的销售额
-        hour_sales = db.session.query(func.sum(Order.pay_amount)).filter_by(
-            merchant_id=merchant.id,
-            status='已送达'
-        ).filter(
-            Order.create_time >= hour_start,
-            Order.create_time < hour_end
-        ).scalar() or 0
-        
-        # 查询当前小时的订单数
-        hour_order_count = Order.query.filter_by(
-            merchant_id=merchant.id,
-            status='已送达'
-        ).filter(
-            Order.create_time >= hour_start,
-            Order.create_time < hour_end
-        ).count()
-        
-        hourly_sales.append(float(hour_sales))
-        hourly_orders.append(hour_order_count)
-    
-    # 构建统计数据
-    statistics = {
-        'total_orders': total_orders,
-        'total_income': total_income,
-        'pending_orders': pending_orders,
-        'total_dishes_sold': total_dishes_sold,
-        'today_orders': today_orders,
-        'today_income': today_income,
-        'active_dishes': active_dishes,
-        'hourly_sales': hourly_sales,
-        'hourly_orders': hourly_orders
-    }
+    # 总计/今日/小时级/天级数据由统计服务分组查询后一次算出
+    statistics = build_statistics(merchant.id, days)
     
     return jsonify({'success': True, 'data': statistics})
 
@@ -566,6 +383,32 @@ def get_merchant_orders():
     if status:
         query = query.filter_by(status=status)
     
+    # 订单项批量加载，菜品名称使用下单时的快照
+    from services.order_query_service import with_items, order_item_dicts
+    
+    if 'cursor' in request.args:
+        # 游标分页：cursor 传上一页返回的 next_cursor（首页传空值），按创建时间倒序，
+        # 翻到多深都只查询一页数据；with_total=1 时额外统计总数
+        if sort != 'latest':
+            return jsonify({'success': False, 'message': '游标分页仅支持按时间排序'}), 400
+        from utils.pagination import keyset_paginate
+        limit = min(max(limit, 1), 100)
+        total = query.count() if request.args.get('with_total', 0, type=int) else None
+        try:
+            page_orders, next_cursor = keyset_paginate(
+                with_items(query), Order.create_time, Order.id, request.args.get('cursor'), limit
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': [dict(order.to_dict(), items=order_item_dicts(order)) for order in page_orders],
+            'total': total,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        })
+    
     # 排序
     if sort == 'latest':
         query = query.order_by(Order.create_time.desc())
@@ -573,25 +416,14 @@ def get_merchant_orders():
         query = query.order_by(Order.total_amount.desc())
     
     # 分页
-    pagination = query.paginate(page=page, per_page=limit, error_out=False)
+    pagination = with_items(query).paginate(page=page, per_page=limit, error_out=False)
     
     # 格式化订单数据
     orders = []
     for order in pagination.items:
         order_data = order.to_dict()
         # 添加订单商品信息
-        order_data['items'] = []
-        for item in order.order_items:
-            # 从Dish模型获取菜品名称
-            dish = Dish.query.get(item.dish_id)
-            dish_name = dish.dish_name if dish else '未知菜品'
-            order_data['items'].append({
-                'id': item.id,
-                'dish_id': item.dish_id,
-                'dish_name': dish_name,
-                'quantity': item.quantity,
-                'price': item.price
-            })
+        order_data['items'] = order_item_dicts(order)
         orders.append(order_data)
     
     return jsonify({
@@ -612,32 +444,15 @@ def get_popular_dishes():
     
     limit = request.args.get('limit', 10, type=int)
     
-    # 统计热销菜品：根据订单商品数量统计（仅统计已送达订单）
-    from sqlalchemy import func
-    
-    # 先创建子查询，统计已送达订单中的菜品销量
-    sales_subquery = db.session.query(
-        OrderItem.dish_id,
-        func.sum(OrderItem.quantity).label('total_sales')
-    ).join(
-        Order, OrderItem.order_id == Order.id
-    ).filter(
-        Order.status == '已送达'  # 只统计已送达订单
-    ).group_by(
-        OrderItem.dish_id
-    ).subquery()
-    
-    # 查询当前商家的所有菜品，按销售量排序
+    # 统计热销菜品：直接按菜品表维护的销量计数排序（仅统计已送达订单）
     popular_dishes_query = db.session.query(
         Dish,
-        func.coalesce(sales_subquery.c.total_sales, 0).label('total_sales')
-    ).outerjoin(
-        sales_subquery, Dish.id == sales_subquery.c.dish_id
+        func.coalesce(Dish.sales, 0).label('total_sales')
     ).filter(
         Dish.merchant_id == merchant.id,
         Dish.is_shelf == True
     ).order_by(
-        func.coalesce(sales_subquery.c.total_sales, 0).desc()
+        func.coalesce(Dish.sales, 0).desc()
     ).limit(limit)
     
     popular_dishes = popular_dishes_query.all()
@@ -667,30 +482,18 @@ def get_merchant_order_detail(order_id):
     if not merchant:
         return jsonify({'success': False, 'message': '未登录'})
     
-    order = Order.query.filter_by(id=order_id, merchant_id=merchant.id).first()
+    # 查询订单并批量加载订单商品
+    from services.order_query_service import with_items, order_item_dicts
+    order = with_items(Order.query.filter_by(id=order_id, merchant_id=merchant.id)).first()
     if not order:
         return jsonify({'success': False, 'message': '订单不存在'})
     
-    # 获取订单商品
-    order_items = OrderItem.query.filter_by(order_id=order_id).all()
-    items = []
-    for item in order_items:
-        # 从Dish模型获取菜品名称
-        dish = Dish.query.get(item.dish_id)
-        dish_name = dish.dish_name if dish else '未知菜品'
-        
-        items.append({
-            'id': item.id,
-            'dish_name': dish_name,
-            'price': item.price,
-            'quantity': item.quantity,
-            'dish_id': item.dish_id
-        })
+    # 获取订单商品（菜品名称使用下单时的快照）
+    items = order_item_dicts(order)
     
     # 从PlatformConfig表获取配送费
     from models.platform_config import PlatformConfig
-    config = PlatformConfig.get_by_key('default_delivery_fee')
-    delivery_fee = float(config.config_value) if config else 5.0  # 默认5元
+    delivery_fee = PlatformConfig.get_default_delivery_fee()  # 未配置时默认5元
     
     # 构造返回数据
     order_data = {
@@ -731,32 +534,56 @@ def update_order_status(order_id):
         return jsonify({'success': False, 'message': '订单不存在'})
     
     # 状态验证和转换
-    valid_statuses = ['待支付', '待接单', '待配送', '已送达', '已取消']
-    if new_status not in valid_statuses:
+    from services.order_status_service import VALID_STATUSES, can_transition, set_order_status, apply_transition_effects
+    if new_status not in VALID_STATUSES:
         return jsonify({'success': False, 'message': '无效的订单状态'})
     
-    # 状态转换逻辑
-    status_transitions = {
-        '待支付': ['待接单', '已取消'],
-        '待接单': ['待配送', '已取消'],
-        '待配送': ['已送达'],
-        '已送达': [],
-        '已取消': []
-    }
-    
-    if new_status not in status_transitions.get(order.status, []):
+    if not can_transition(order.status, new_status):
         return jsonify({'success': False, 'message': '状态转换不允许'})
     
-    # 更新状态
-    order.status = new_status
-    db.session.commit()
+    # 更新状态（改为待接单时补记支付时间）
+    set_order_status(order, new_status)
+    
+    # 维护菜品销量和商户经营汇总（与状态更新在同一事务中提交）
+    apply_transition_effects([order], new_status)
     
-    # 发送通知
-    from services.notification_service import send_order_notification
-    send_order_notification(order.student.phone, order.order_no, new_status)
+    # 发送通知（异步模式下写入通知队列，随状态更新一起提交）
+    from services.notification_service import notify_order
+    notify_order(order.student.phone, order.order_no, new_status)
+    
+    db.session.commit()
     
     return jsonify({'success': True, 'message': '订单状态已更新'})
 
+# 批量修改订单状态：{"items": [{"order_id": 1, "status": "待配送"}, ...]}，全部合法时在一个事务中生效
+@merchant_bp.route('/orders/status', methods=['PUT'])
+@api_login_required
+def batch_update_order_status():
+    merchant = get_current_merchant()
+    if not merchant:
+        return jsonify({'success': False, 'message': '未登录'})
+    
+    data = request.get_json() or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'message': '请选择要处理的订单'})
+    if len(items) > Config.ORDER_BATCH_MAX_SIZE:
+        return jsonify({'success': False, 'message': f'每次最多处理{Config.ORDER_BATCH_MAX_SIZE}个订单'})
+    
+    changes = []
+    for item in items:
+        try:
+            changes.append((int(item['order_id']), item['status']))
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'success': False, 'message': '参数格式错误'})
+    
+    from services.order_status_service import batch_update_order_status as apply_batch
+    updated, errors = apply_batch(merchant.id, changes)
+    if errors:
+        return jsonify({'success': False, 'message': '部分订单无法处理，本次未做任何修改', 'data': {'errors': errors}})
+    
+    return jsonify({'success': True, 'message': f'已更新{updated}个订单', 'data': {'updated': updated}})
+
 @merchant_bp.route('/dishes', methods=['GET'])
 @api_login_required
 def get_dishes():
@@ -780,11 +607,8 @@ def get_dishes():
     # 构建菜品列表
     dish_list = []
     for dish in paginated.items:
-        # 计算销量：只统计状态为"已送达"的订单
-        sales = db.session.query(func.count(OrderItem.id))\
-            .join(Order, Order.id == OrderItem.order_id)\
-            .filter(OrderItem.dish_id == dish.id, Order.status == '已送达')\
-            .scalar() or 0
+        # 销量：菜品表维护的已送达订单累计数量
+        sales = dish.sales or 0
         
         dish_list.append({
             'id': dish.id,
@@ -1000,10 +824,8 @@ def get_merchant_settings():
     if not merchant:
         return jsonify({'success': False, 'message': '未登录'})
     
-    # 获取并验证is_open字段
-    raw_is_open = getattr(merchant, 'is_open', True)
-    # 确保返回布尔类型，处理可能的非布尔值
-    is_open_bool = bool(raw_is_open) if raw_is_open is not None else True
+    # 营业状态按营业时间实时计算，不依赖定时任务是否已刷新
+    is_open_bool = calculate_merchant_status(merchant)
     
     settings_data = {
         'merchant_name': merchant.merchant_name,
@@ -1064,59 +886,23 @@ def update_merchant_settings():
                 pass
             
         if 'business_hours' in data:
-                merchant.business_hours = data['business_hours'].strip()
-                print(f"更新营业时间: {merchant.business_hours}")
-                # 当营业时间更新时，根据新的营业时间和当前时间重新计算is_open
-                if merchant.business_hours:
+                business_hours = data['business_hours'].strip()
+                if len(business_hours) > BUSINESS_HOURS_MAX_LENGTH:
+                    db.session.rollback()
+                    return jsonify({'code': 400, 'msg': f'营业时间不能超过{BUSINESS_HOURS_MAX_LENGTH}个字符'}), 400
+                if business_hours:
+                    # 保存前校验格式，避免写入无法解析的营业时间
                     try:
-                        # 解析营业时间，格式：09:00-22:00
-                        if '-' in merchant.business_hours:
-                            open_time_str, close_time_str = merchant.business_hours.split('-')
-                            
-                            # 验证时间格式
-                            if ':' not in open_time_str or ':' not in close_time_str:
-                                raise ValueError("时间格式不正确，应为HH:MM")
-                                
-                            # 获取当前时间
-                            now = datetime.now()
-                            print(f"当前时间: {now}")
-                            
-                            # 解析开始和结束时间
-                            open_hour, open_minute = map(int, open_time_str.split(':'))
-                            close_hour, close_minute = map(int, close_time_str.split(':'))
-                            
-                            # 验证时间范围
-                            if not (0 <= open_hour <= 23) or not (0 <= open_minute <= 59) or \
-                               not (0 <= close_hour <= 23) or not (0 <= close_minute <= 59):
-                                raise ValueError("时间超出有效范围")
-                                
-                            # 创建今天的营业时间对象
-                            open_time = datetime(now.year, now.month, now.day, open_hour, open_minute)
-                            close_time = datetime(now.year, now.month, now.day, close_hour, close_minute)
-                            
-                            # 处理跨天情况（例如：22:00-02:00）
-                            if close_time < open_time:
-                                # 如果结束时间早于开始时间，说明跨天
-                                if now >= open_time or now <= close_time:
-                                    merchant.is_open = True
-                                else:
-                                    merchant.is_open = False
-                            else:
-                                # 正常当天情况
-                                if open_time <= now <= close_time:
-                                    merchant.is_open = True
-                                else:
-                                    merchant.is_open = False
-                                    
-                            print(f"营业时间: {open_time_str} - {close_time_str}")
-                            print(f"计算后is_open状态: {merchant.is_open}")
-                        else:
-                            raise ValueError("营业时间格式不正确，应为开始时间-结束时间")
-                    except Exception as e:
-                        # 如果解析失败，设置默认状态为营业中
-                        print(f"解析营业时间失败: {str(e)}")
-                        merchant.is_open = True  # 默认营业中
-                        print(f"设置默认is_open状态为: {merchant.is_open}")
+                        BusinessHours.parse(business_hours)
+                    except ValueError as e:
+                        db.session.rollback()
+                        return jsonify({'code': 400, 'msg': f'营业时间格式不正确：{e}'}), 400
+                merchant.business_hours = business_hours
+                # 记录修改时间，调度器所在进程据此同步新的营业时间
+                merchant.hours_update_time = datetime.now()
+                print(f"更新营业时间: {merchant.business_hours}")
+                # 当营业时间更新时，根据新的营业时间和当前时间重新计算is_open（格式错误时按营业中处理）
+                merchant.is_open = calculate_merchant_status(merchant)
         
         # 移除手动设置is_open的逻辑，完全由系统根据营业时间自动管理
         # 不再接受前端传入的is_open参数，确保状态自动计算的准确性
@@ -1124,6 +910,11 @@ def update_merchant_settings():
         # 提交到数据库
         db.session.commit()
         
+        if 'business_hours' in data:
+            # 营业时间变更后重新调度下一次开店/打烊
+            from services.merchant_status_service import schedule_merchant
+            schedule_merchant(merchant.id, merchant.business_hours)
+        
         return jsonify({
             'code': 200,
             'msg': '设置更新成功',
@@ -1161,8 +952,11 @@ def update_merchant_password():
             return jsonify({'success': False, 'message': '请提供当前密码和新密码'})
         
         # 验证当前密码是否正确
-        if not bcrypt.check_password_hash(merchant.password, current_password):
-            return jsonify({'success': False, 'message': '当前密码不正确'})
+        try:
+            if not verify_password_attempt(f'merchant:{merchant.id}', current_password, merchant.password, request.remote_addr):
+                return jsonify({'success': False, 'message': '当前密码不正确'})
+        except PasswordCheckRejected as e:
+            return jsonify({'success': False, 'message': e.msg}), e.code
         
         # 检查新密码条件（与注册时一致）
         if len(new_password) < 8 or len(new_password) > 20:
@@ -1348,11 +1142,12 @@ def accept_order(order_id):
         return jsonify({'success': False, 'message': '订单状态错误'}), 400
     
     order.status = '待配送'
-    db.session.commit()
     
-    # 发送通知
-    from services.notification_service import send_order_notification
-    send_order_notification(order.student.phone, order.order_no, '待配送')
+    # 发送通知（异步模式下写入通知队列，随状态更新一起提交）
+    from services.notification_service import notify_order
+    notify_order(order.student.phone, order.order_no, '待配送')
+    
+    db.session.commit()
     
     return jsonify({'success': True, 'message': '接单成功'})
 
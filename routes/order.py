@@ -6,8 +6,11 @@ from models.dish import Dish
 from models.student import Student
 from services.payment_service import simulate_payment
 from extensions import db
-from routes.student import api_login_required
-import bcrypt
+from config import Config
+from routes.student import api_login_required, get_current_student
+from services.auth_service import authorize_payment
+from utils.pay_grant import current_device_id
+from utils.password_utils import PasswordCheckRejected
 
 order_bp = Blueprint('order', __name__)
 
@@ -23,14 +26,15 @@ def pay_order(order_id):
     if order.student_id != student_id:
         return jsonify({'code': 403, 'msg': '无权操作此订单'}), 403
     
-    # 验证支付密码
+    # 验证支付密码（有效期内可出示支付凭证代替支付密码）
     data = request.get_json()
     pay_password = data.get('pay_password')
-    if not pay_password:
+    pay_grant = data.get('pay_grant')
+    if not pay_password and not pay_grant:
         return jsonify({'code': 400, 'msg': '请输入支付密码'}), 400
     
-    # 获取学生信息
-    student = Student.query.get(student_id)
+    # 获取学生信息（登录校验时已加载，不再重复查询）
+    student = get_current_student()
     if not student:
         return jsonify({'code': 404, 'msg': '用户不存在'}), 404
     
@@ -38,15 +42,23 @@ def pay_order(order_id):
     if not student.pay_password:
         return jsonify({'code': 402, 'msg': '未设置支付密码'}), 402
     
-    # 验证支付密码
-    if not bcrypt.checkpw(pay_password.encode('utf-8'), student.pay_password.encode('utf-8')):
-        return jsonify({'code': 400, 'msg': '支付密码错误'}), 400
+    # 验证支付凭证或支付密码（尝试次数过多或密码线程池繁忙时直接拒绝）
+    try:
+        authorized, new_grant = authorize_payment(student, pay_password, pay_grant, current_device_id(), request.remote_addr)
+    except PasswordCheckRejected as e:
+        return jsonify({'code': e.code, 'msg': e.msg}), e.code
+    if not authorized:
+        msg = '支付密码错误' if pay_password else '支付凭证已失效，请输入支付密码'
+        return jsonify({'code': 400, 'msg': msg}), 400
     
     try:
         _, coupons_added = simulate_payment(order_id)
         response = {'code': 200, 'msg': '支付成功'}
         if coupons_added > 0:
             response['coupons_added'] = coupons_added
+        if new_grant:
+            # 新签发的支付凭证，有效期内再次支付时可代替支付密码
+            response['data'] = {'pay_grant': new_grant, 'pay_grant_expires_in': Config.PAY_GRANT_TTL_SECONDS}
         return jsonify(response)
     except Exception as e:
         return jsonify({'code': 500, 'msg': str(e)}), 500
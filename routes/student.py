@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, session, render_template
+from flask import Blueprint, request, jsonify, session, render_template, g
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.student import Student
 from models.cart import Cart
@@ -10,52 +10,77 @@ from models.complaint import Complaint
 from models.comment import Comment
 from models.address import Address
 from models.platform_config import PlatformConfig
+from config import Config
 import re
 from datetime import datetime
-from services.auth_service import student_register, student_login
+from services.auth_service import student_register, student_login, verify_password_attempt, authorize_payment
+from utils.pay_grant import current_device_id
+from utils.password_utils import PasswordCheckRejected
 from services.order_service import create_order
 from utils.validator import validate_student_register
 from utils.file_utils import save_file, allowed_file
 from extensions import db
+from utils.logger import get_logger
+from utils.identity_cache import get_active_flag, set_active_flag
 import bcrypt
 import uuid
 import os
 
+logger = get_logger('student')
+
+def _student_id_candidates():
+    """依次给出 session 和 JWT 中的学生ID"""
+    student_id = session.get('student_id')
+    if isinstance(student_id, int):
+        yield student_id
+    try:
+        from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+        if identity and ':' in identity:
+            user_type, user_id = identity.split(':', 1)
+            if user_type == 'student':
+                yield int(user_id)
+    except Exception as e:
+        logger.warning('JWT token验证错误', extra={'fields': {'error': str(e), 'path': request.path}})
+
 # 检查学生是否已登录的装饰器（API路由用）
+# 解析出的学生ID保存在 g.student_id，查询过的学生对象保存在 g.current_student，
+# 视图中通过 get_current_student() 获取，同一请求内不再重复查询
 def api_login_required(f):
     def decorated_function(*args, **kwargs):
-        # 首先检查session中是否有登录信息
-        if 'student_id' in session:
-            # 检查session中的student_id是否有效
-            student_id = session['student_id']
-            if isinstance(student_id, int):
+        for student_id in _student_id_candidates():
+            # 账号可用状态优先读缓存，未命中时才查询学生表
+            active = get_active_flag('student', student_id)
+            if active is None:
                 student = Student.query.get(student_id)
-                if student:
-                    return f(*args, **kwargs)
-        
-        # 然后检查JWT token
-        try:
-            from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
-            verify_jwt_in_request(optional=True)
-            identity = get_jwt_identity()
+                if not student:
+                    continue
+                active = bool(student.is_active)
+                set_active_flag('student', student_id, active)
+                g.current_student = student
             
-            if identity and ':' in identity:
-                user_type, user_id = identity.split(':', 1)
-                if user_type == 'student':
-                    # 检查user_id是否有效
-                    user_id = int(user_id)
-                    student = Student.query.get(user_id)
-                    if student:
-                        # 将student_id添加到session中以便后续使用
-                        session['student_id'] = user_id
-                        return f(*args, **kwargs)
-        except Exception as e:
-            print(f'JWT token验证错误：{str(e)}')
+            if not active:
+                session.pop('student_id', None)
+                return jsonify({'code': 403, 'msg': '您的账号已被禁用'}), 403
+            
+            g.student_id = student_id
+            # 将student_id添加到session中以便后续使用
+            session['student_id'] = student_id
+            return f(*args, **kwargs)
         
         return jsonify({'code': 401, 'msg': '未登录'}), 401
     decorated_function.__name__ = f.__name__
     return decorated_function
 
+def get_current_student():
+    """获取当前登录的学生（需在 api_login_required 保护的视图中调用），同一请求内只查询一次"""
+    student = g.get('current_student')
+    if student is None and g.get('student_id') is not None:
+        student = Student.query.get(g.student_id)
+        g.current_student = student
+    return student
+
 student_bp = Blueprint('student', __name__)
 
 # 辅助函数：验证支付密码是否为6位数字
@@ -67,8 +92,7 @@ def validate_pay_password(pay_password):
 def register():
     # 检查系统是否处于维护中
     from models.platform_config import PlatformConfig
-    maintenance_config = PlatformConfig.get_by_key('system_maintenance')
-    if maintenance_config and maintenance_config.config_value.lower() == 'true':
+    if PlatformConfig.is_maintenance():
         return jsonify({'code': 403, 'msg': '系统正在维护中'}), 200
     
     data = request.get_json()
@@ -110,8 +134,7 @@ def register():
 def login():
     # 检查系统是否处于维护中
     from models.platform_config import PlatformConfig
-    maintenance_config = PlatformConfig.get_by_key('system_maintenance')
-    if maintenance_config and maintenance_config.config_value.lower() == 'true':
+    if PlatformConfig.is_maintenance():
         return jsonify({'code': 403, 'msg': '系统正在维护中'}), 200
     
     data = request.get_json()
@@ -121,11 +144,12 @@ def login():
     if not login_id or not password:
         return jsonify({'code': 400, 'msg': '请输入账号和密码'}), 400
     
-    result = student_login(login_id, password)
+    result = student_login(login_id, password, ip=request.remote_addr)
     if not result or isinstance(result, dict) and result.get('error'):
-        # 如果返回包含具体错误信息，直接传递给前端
+        # 如果返回包含具体错误信息，直接传递给前端（被限流或繁忙时使用返回的状态码）
         msg = result.get('error') if isinstance(result, dict) else '账号或密码错误'
-        return jsonify({'code': 401, 'msg': msg}), 401
+        code = result.get('code', 401) if isinstance(result, dict) else 401
+        return jsonify({'code': code, 'msg': msg}), code
     
     # 在session中设置学生ID
     student = Student.query.filter_by(student_id=login_id).first() or \
@@ -144,7 +168,7 @@ def login():
 @api_login_required
 def get_profile():
     user_id = session['student_id']
-    student = Student.query.get(user_id)
+    student = get_current_student()
     if not student:
         return jsonify({'code': 404, 'msg': '用户不存在'}), 404
     
@@ -187,7 +211,7 @@ def change_password():
 def change_password_impl():
     try:
         user_id = session['student_id']
-        student = Student.query.get(user_id)
+        student = get_current_student()
         if not student:
             return jsonify({'code': 404, 'msg': '用户不存在'}), 404
         
@@ -204,8 +228,11 @@ def change_password_impl():
             return jsonify({'code': 400, 'msg': '请输入当前密码和新密码'}), 400
         
         # 验证当前密码是否正确
-        if not bcrypt.checkpw(current_password.encode('utf-8'), student.password.encode('utf-8')):
-            return jsonify({'code': 400, 'msg': '当前密码错误'}), 400
+        try:
+            if not verify_password_attempt(f'student:{student.id}', current_password, student.password, request.remote_addr):
+                return jsonify({'code': 400, 'msg': '当前密码错误'}), 400
+        except PasswordCheckRejected as e:
+            return jsonify({'code': e.code, 'msg': e.msg}), e.code
         
         # 验证新密码长度和复杂度
         if len(new_password) < 8 or len(new_password) > 20:
@@ -234,7 +261,7 @@ def change_password_impl():
 def upload_avatar():
     try:
         user_id = session['student_id']
-        student = Student.query.get(user_id)
+        student = get_current_student()
         if not student:
             return jsonify({'code': 404, 'msg': '用户不存在'}), 404
         
@@ -283,7 +310,7 @@ def upload_avatar():
 def update_profile_put():
     try:
         user_id = session['student_id']
-        student = Student.query.get(user_id)
+        student = get_current_student()
         if not student:
             return jsonify({'code': 404, 'msg': '用户不存在'}), 404
         
@@ -438,7 +465,7 @@ def add_address():
 def check_pay_password_status():
     try:
         user_id = session['student_id']
-        student = Student.query.get(user_id)
+        student = get_current_student()
         if not student:
             return jsonify({'code': 404, 'msg': '用户不存在'}), 404
         
@@ -460,7 +487,7 @@ def check_pay_password_status():
 def set_pay_password():
     try:
         user_id = session['student_id']
-        student = Student.query.get(user_id)
+        student = get_current_student()
         if not student:
             return jsonify({'code': 404, 'msg': '用户不存在'}), 404
         
@@ -484,12 +511,15 @@ def set_pay_password():
             return jsonify({'code': 400, 'msg': '支付密码必须为6位数字'}), 400
         
         # 验证登录密码
-        if not bcrypt.checkpw(login_password.encode('utf-8'), student.password.encode('utf-8')):
-            return jsonify({
-                'code': 400, 
-                'msg': '登录密码错误',
-                'data': {'error_type': 'login_password'}
-            }), 400
+        try:
+            if not verify_password_attempt(f'student:{student.id}', login_password, student.password, request.remote_addr):
+                return jsonify({
+                    'code': 400, 
+                    'msg': '登录密码错误',
+                    'data': {'error_type': 'login_password'}
+                }), 400
+        except PasswordCheckRejected as e:
+            return jsonify({'code': e.code, 'msg': e.msg}), e.code
         
         # 加密支付密码并保存
         hashed_pay_password = bcrypt.hashpw(pay_password.encode('utf-8'), bcrypt.gensalt())
@@ -512,7 +542,7 @@ def set_pay_password():
 def change_pay_password():
     try:
         user_id = session['student_id']
-        student = Student.query.get(user_id)
+        student = get_current_student()
         if not student:
             return jsonify({'code': 404, 'msg': '用户不存在'}), 404
         
@@ -532,12 +562,15 @@ def change_pay_password():
             return jsonify({'code': 400, 'msg': '请输入原支付密码和新支付密码'}), 400
         
         # 验证原支付密码
-        if not bcrypt.checkpw(old_pay_password.encode('utf-8'), student.pay_password.encode('utf-8')):
-            return jsonify({
-                'code': 400,
-                'msg': '原支付密码错误',
-                'data': {'error_type': 'old_pay_password'}
-            }), 400
+        try:
+            if not verify_password_attempt(f'pay:student:{student.id}', old_pay_password, student.pay_password, request.remote_addr):
+                return jsonify({
+                    'code': 400,
+                    'msg': '原支付密码错误',
+                    'data': {'error_type': 'old_pay_password'}
+                }), 400
+        except PasswordCheckRejected as e:
+            return jsonify({'code': e.code, 'msg': e.msg}), e.code
         
         # 验证新支付密码格式
         if not validate_pay_password(new_pay_password):
@@ -564,7 +597,7 @@ def change_pay_password():
 def wallet_recharge():
     try:
         user_id = session['student_id']
-        student = Student.query.get(user_id)
+        student = get_current_student()
         if not student:
             return jsonify({'code': 404, 'msg': '用户不存在'}), 404
         
@@ -603,7 +636,7 @@ def wallet_recharge():
 def wallet_pay():
     try:
         user_id = session['student_id']
-        student = Student.query.get(user_id)
+        student = get_current_student()
         if not student:
             return jsonify({'code': 404, 'msg': '用户不存在'}), 404
         
@@ -611,11 +644,12 @@ def wallet_pay():
         if not data:
             return jsonify({'code': 400, 'msg': '请求数据不能为空'}), 400
         
-        # 获取支付密码和金额
+        # 获取支付密码（或有效期内的支付凭证）和金额
         password = data.get('password')
+        pay_grant = data.get('pay_grant')
         amount = data.get('amount')
         
-        if not password or amount is None:
+        if (not password and not pay_grant) or amount is None:
             return jsonify({'code': 400, 'msg': '请输入支付密码和金额'}), 400
         
         # 检查是否已设置支付密码
@@ -623,12 +657,17 @@ def wallet_pay():
             return jsonify({'code': 402, 'msg': '未设置支付密码'}), 402
         
         # 验证支付密码格式（6位数字）
-        if not validate_pay_password(password):
+        if password and not validate_pay_password(password):
             return jsonify({'code': 400, 'msg': '支付密码必须为6位数字'}), 400
         
-        # 验证支付密码
-        if not bcrypt.checkpw(password.encode('utf-8'), student.pay_password.encode('utf-8')):
-            return jsonify({'code': 400, 'msg': '支付密码错误'}), 400
+        # 验证支付凭证或支付密码
+        try:
+            authorized, new_grant = authorize_payment(student, password, pay_grant, current_device_id(), request.remote_addr)
+        except PasswordCheckRejected as e:
+            return jsonify({'code': e.code, 'msg': e.msg}), e.code
+        if not authorized:
+            msg = '支付密码错误' if password else '支付凭证已失效，请输入支付密码'
+            return jsonify({'code': 400, 'msg': msg}), 400
         
         # 检查钱包余额
         if float(student.wallet) < amount:
@@ -642,7 +681,10 @@ def wallet_pay():
             'code': 200,
             'msg': '支付成功',
             'data': {
-                'new_balance': float(student.wallet)
+                'new_balance': float(student.wallet),
+                # 新签发的支付凭证（出示有效凭证支付时为 None）
+                'pay_grant': new_grant,
+                'pay_grant_expires_in': Config.PAY_GRANT_TTL_SECONDS if new_grant else None
             }
         })
     except Exception as e:
@@ -656,8 +698,7 @@ def get_delivery_fee():
     """获取配送费"""
     try:
         # 从PlatformConfig表获取配送费
-        config = PlatformConfig.get_by_key('default_delivery_fee')
-        delivery_fee = float(config.config_value) if config else 5.0  # 默认5元
+        delivery_fee = PlatformConfig.get_default_delivery_fee()  # 未配置时默认5元
         return jsonify({'code': 200, 'data': {'delivery_fee': delivery_fee}})
     except Exception as e:
         print(f'获取配送费错误：{str(e)}')
@@ -1118,18 +1159,17 @@ def get_student_order_detail(order_id):
         if not student_id:
             return jsonify({'code': 401, 'msg': '未登录或会话已过期'}), 401
         
-        # 查找订单
-        order = Order.query.filter_by(id=order_id, student_id=student_id).options(
-            db.joinedload(Order.merchant),
-            db.joinedload(Order.order_items).joinedload(OrderItem.dish)
-        ).first()
+        # 查找订单（订单项批量加载，菜品名称和图片使用下单时的快照，不再关联菜品表）
+        from services.order_query_service import with_items, order_item_dicts
+        order = with_items(Order.query.filter_by(id=order_id, student_id=student_id).options(
+            db.joinedload(Order.merchant)
+        )).first()
         
         if not order:
             return jsonify({'code': 404, 'msg': '订单不存在'}), 404
         
         # 从PlatformConfig表获取配送费
-        config = PlatformConfig.get_by_key('default_delivery_fee')
-        delivery_fee = float(config.config_value) if config else 5.0  # 默认5元
+        delivery_fee = PlatformConfig.get_default_delivery_fee()  # 未配置时默认5元
         
         # 构建响应数据
         order_data = {
@@ -1148,18 +1188,9 @@ def get_student_order_detail(order_id):
             'merchant': {
                 'name': order.merchant.merchant_name if order.merchant else '未知商户'
             },
-            'items': []
+            'items': order_item_dicts(order)  # 构建订单项
         }
         
-        # 构建订单项
-        for item in order.order_items:
-            item_data = {
-                'dish_name': item.dish.dish_name if item.dish else '未知菜品',
-                'price': item.price,
-                'quantity': item.quantity
-            }
-            order_data['items'].append(item_data)
-        
         return jsonify({
             'code': 200,
             'msg': '获取订单详情成功',
@@ -1202,19 +1233,33 @@ def get_student_orders():
             db_status = status_map.get(status, status)
             query = query.filter_by(status=db_status)
         
-        # 按创建时间倒序排序
-        query = query.order_by(Order.create_time.desc())
-        
-        # 分页
-        pagination = query.paginate(page=page, per_page=page_size, error_out=False)
+        # 订单项批量加载，菜品名称和图片使用下单时的快照
+        from services.order_query_service import with_items, order_item_dicts
+        if 'cursor' in request.args:
+            # 游标分页：cursor 传上一页返回的 next_cursor（首页传空值），按创建时间倒序，
+            # 翻到多深都只查询一页数据；with_total=1 时额外统计总数
+            from utils.pagination import keyset_paginate
+            page_size = min(max(page_size, 1), 100)
+            total = query.count() if request.args.get('with_total', 0, type=int) else None
+            try:
+                orders, next_cursor = keyset_paginate(
+                    with_items(query), Order.create_time, Order.id, request.args.get('cursor'), page_size
+                )
+            except ValueError as e:
+                return jsonify({'code': 400, 'msg': str(e)}), 400
+        else:
+            # 按创建时间倒序排序并按页码分页
+            pagination = with_items(query.order_by(Order.create_time.desc())).paginate(
+                page=page, per_page=page_size, error_out=False
+            )
+            orders, total = pagination.items, pagination.total
         
         # 从PlatformConfig表获取配送费（只获取一次，提高性能）
-        config = PlatformConfig.get_by_key('default_delivery_fee')
-        delivery_fee = float(config.config_value) if config else 5.0  # 默认5元
+        delivery_fee = PlatformConfig.get_default_delivery_fee()  # 未配置时默认5元
         
         # 构建响应数据
         orders_data = []
-        for order in pagination.items:
+        for order in orders:
             # 构建符合前端期望的订单数据结构
             order_data = {
                 'order_id': order.id,  # 前端期望的字段名
@@ -1232,26 +1277,30 @@ def get_student_orders():
                 'merchant': {
                     'name': order.merchant.merchant_name if order.merchant else '未知商户'
                 },
-                'items': []  # 前端期望的订单项数组名
+                'items': order_item_dicts(order)  # 前端期望的订单项数组名
             }
             
-            # 构建订单项
-            for item in order.order_items:
-                item_data = {
-                    'dish_name': item.dish.dish_name if item.dish else '未知菜品',
-                    'price': item.price,
-                    'quantity': item.quantity
-                }
-                order_data['items'].append(item_data)
-            
             orders_data.append(order_data)
         
+        if 'cursor' in request.args:
+            return jsonify({
+                'code': 200,
+                'msg': '获取订单列表成功',
+                'data': {
+                    'items': orders_data,
+                    'total': total,
+                    'page_size': page_size,
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None
+                }
+            })
+        
         return jsonify({
             'code': 200,
             'msg': '获取订单列表成功',
             'data': {
                 'items': orders_data,
-                'total': pagination.total,
+                'total': total,
                 'page_size': page_size,
                 'page': page
             }
@@ -1362,10 +1411,13 @@ def cancel_order(order_id):
         if not order:
             return jsonify({'code': 404, 'msg': '订单不存在'}), 404
         
+        # 本次取消的日志字段，最后只记录一条结构化日志
+        log_fields = {'order_id': order.id, 'student_id': user_id, 'old_status': order.status}
+        
         # 如果订单状态是待接单，需要退款
         if order.status == '待接单':
             # 获取学生和商户信息
-            student = Student.query.get(user_id)
+            student = get_current_student()
             merchant = Merchant.query.get(order.merchant_id)
             
             if not student or not merchant:
@@ -1378,8 +1430,7 @@ def cancel_order(order_id):
             refund_amount = Decimal(str(order.pay_amount))
             
             # 获取配送费
-            config = PlatformConfig.get_by_key('default_delivery_fee')
-            delivery_fee = Decimal(str(config.config_value)) if config else Decimal('5.0')
+            delivery_fee = Decimal(str(PlatformConfig.get_default_delivery_fee()))
             
             # 计算商户应承担的金额（不含配送费）
             merchant_earnings = refund_amount - delivery_fee
@@ -1389,24 +1440,20 @@ def cancel_order(order_id):
             if merchant.wallet < 0:
                 return jsonify({'code': 500, 'msg': '商户钱包余额不足，无法退款'}), 500
             
-            # 从平台扣除配送费
-            current_earnings = Decimal(str(PlatformConfig.get_delivery_fee_earnings()))
-            new_earnings = current_earnings - delivery_fee
-            if new_earnings < 0:
+            # 从平台扣除配送费（追加一条负数流水并原子扣减总收入，总收入不足时不扣减，随取消事务一起提交）
+            if PlatformConfig.add_delivery_fee_earnings(
+                -delivery_fee, 'refund', order_id=order.id, require_non_negative=True
+            ) is None:
                 return jsonify({'code': 500, 'msg': '平台配送费收入不足，无法退款'}), 500
-            PlatformConfig.update_delivery_fee_earnings(new_earnings)
             
             # 将全部金额退还给学生
             student.wallet += refund_amount
             
-            # 添加退款日志
-            print(f"订单 {order_id} 取消退款：")
-            print(f"  - 退款总金额：¥{refund_amount:.2f}")
-            print(f"  - 从商户扣取：¥{merchant_earnings:.2f}")
-            print(f"  - 从平台扣取配送费：¥{delivery_fee:.2f}")
-            print(f"  - 商户新余额：¥{merchant.wallet:.2f}")
-            print(f"  - 平台配送费新收入：¥{new_earnings:.2f}")
-            print(f"  - 学生新余额：¥{student.wallet:.2f}")
+            log_fields.update({
+                'refund_amount': float(refund_amount),
+                'merchant_deducted': float(merchant_earnings),
+                'delivery_fee_refunded': float(delivery_fee)
+            })
         
         # 如果订单使用了优惠券，需要返还优惠券
         if order.coupon_id is not None:
@@ -1421,18 +1468,16 @@ def cancel_order(order_id):
                 user_coupon.is_used = False
                 user_coupon.use_time = None
                 
-                # 更新优惠券使用数量
-                coupon = Coupon.query.get(order.coupon_id)
-                if coupon and coupon.used > 0:
-                    coupon.used -= 1
+                # 更新优惠券使用数量（不会减为负数）
+                from services.coupon_service import release_coupon
+                release_coupon(order.coupon_id)
                 
-                print(f"订单 {order_id} 返还优惠券：")
-                print(f"  - 优惠券ID：{order.coupon_id}")
-                print(f"  - 用户优惠券ID：{user_coupon.id}")
+                log_fields['coupon_released'] = order.coupon_id
         
         # 只有待接单状态的订单才需要增加库存
         if order.status == '待接单':
             # 获取订单中的所有菜品
+            stock_changes = []
             order_items = OrderItem.query.filter_by(order_id=order_id).all()
             for item in order_items:
                 dish = Dish.query.get(item.dish_id)
@@ -1450,16 +1495,21 @@ def cancel_order(order_id):
                         else:
                             # 否则库存加上订单数量
                             dish.stock += order_quantity
-                        print(f"菜品 {dish.dish_name} 库存更新：原库存 {old_stock} -> 新库存 {dish.stock} (订单数量: {order_quantity})")
+                        stock_changes.append({'dish_id': dish.id, 'old_stock': old_stock, 'new_stock': dish.stock})
+            log_fields['stock_changes'] = stock_changes
 
-        # 将订单状态改为已取消
+        # 将订单状态改为已取消，并计入商户经营汇总（同一事务提交）
         order.status = '已取消'
+        from services.stats_rollup_service import record_order_cancelled
+        record_order_cancelled(order)
         db.session.commit()
         
+        logger.info('订单取消成功', extra={'fields': log_fields})
+        
         return jsonify({'code': 200, 'msg': '取消订单成功，您的花费已退还至钱包'})
     except Exception as e:
         db.session.rollback()
-        print(f'取消订单错误：{str(e)}')
+        logger.exception('取消订单错误', extra={'fields': {'order_id': order_id}})
         return jsonify({'code': 500, 'msg': '取消订单失败：服务器内部错误'}), 500
 
 # 确认收货
@@ -1527,6 +1577,15 @@ def delete_order(order_id):
         if not order:
             return jsonify({'code': 404, 'msg': '订单不存在'}), 404
         
+        # 已送达订单被删除时，同步扣回菜品销量计数
+        if order.status == '已送达':
+            from services.sales_service import add_order_sales
+            add_order_sales(order, sign=-1)
+        
+        # 扣回该订单已计入的商户经营汇总
+        from services.stats_rollup_service import remove_order_stats
+        remove_order_stats(order)
+        
         # 删除关联的订单项
         OrderItem.query.filter_by(order_id=order_id).delete()
         
@@ -1870,16 +1929,24 @@ def get_comments():
         page = int(request.args.get('page', 1))
         page_size = int(request.args.get('page_size', 10))
         
-        # 构建查询 - 关联Order表获取订单号
-        query = Comment.query.join(Order, Comment.order_id == Order.id).filter_by(student_id=user_id)
-        
-        # 按创建时间倒序排序
-        query = query.order_by(Comment.create_time.desc())
+        # 构建查询 - 关联Order表获取订单号（按评价表的学生ID筛选，可使用评价表的索引）
+        query = Comment.query.join(Order, Comment.order_id == Order.id).filter(Comment.student_id == user_id)
         
-        # 分页查询
-        total = query.count()
-        pagination = query.paginate(page=page, per_page=page_size)
-        comments = pagination.items
+        if 'cursor' in request.args:
+            # 游标分页：cursor 传上一页返回的 next_cursor（首页传空值），with_total=1 时额外统计总数
+            from utils.pagination import keyset_paginate
+            page_size = min(max(page_size, 1), 100)
+            total = query.count() if request.args.get('with_total', 0, type=int) else None
+            try:
+                comments, next_cursor = keyset_paginate(
+                    query, Comment.create_time, Comment.id, request.args.get('cursor'), page_size
+                )
+            except ValueError as e:
+                return jsonify({'code': 400, 'msg': str(e)}), 400
+        else:
+            # 按创建时间倒序排序并按页码分页（总数由分页对象统计，不再单独 count）
+            pagination = query.order_by(Comment.create_time.desc()).paginate(page=page, per_page=page_size)
+            comments, total = pagination.items, pagination.total
         
         # 转换为JSON可序列化的数据
         comment_list = []
@@ -1897,6 +1964,18 @@ def get_comments():
                 'reply_time': comment.reply_time.strftime('%Y-%m-%d %H:%M:%S') if comment.reply_time else None
             })
         
+        if 'cursor' in request.args:
+            return jsonify({
+                'code': 200,
+                'data': {
+                    'items': comment_list,
+                    'total': total,
+                    'page_size': page_size,
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None
+                }
+            })
+        
         return jsonify({
             'code': 200,
             'data': {
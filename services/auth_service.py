@@ -1,9 +1,38 @@
 from models.student import Student
 from models.merchant import Merchant
-from utils.password_utils import encrypt_password, verify_password
+from utils.password_utils import encrypt_password, verify_password, PasswordCheckRejected
+from utils.login_throttle import throttle_attempt, record_failure, reset_account
 from utils.jwt_utils import generate_token
 from extensions import db
 
+def verify_password_attempt(account_key: str, password: str, encrypted_password: str, ip: str = None) -> bool:
+    """带限流的密码校验，返回密码是否正确
+
+    账号或IP尝试次数过多（LoginThrottled）、密码线程池繁忙（PasswordHashBusy）时抛出
+    PasswordCheckRejected，此时不会计算哈希；校验失败计入IP失败次数，校验成功后清除该账号的尝试记录
+    """
+    throttle_attempt(account_key, ip)
+    if not verify_password(password, encrypted_password):
+        record_failure(ip)
+        return False
+    reset_account(account_key)
+    return True
+
+def authorize_payment(student, pay_password: str = None, pay_grant: str = None, device_id: str = '', ip: str = None):
+    """支付授权，返回 (是否通过, 新签发的支付凭证)
+
+    出示的支付凭证有效时直接通过，不计算支付密码哈希；否则校验支付密码，通过后签发新凭证。
+    尝试次数过多或密码线程池繁忙时抛出 PasswordCheckRejected
+    """
+    from utils.pay_grant import issue_pay_grant, verify_pay_grant
+    if pay_grant and verify_pay_grant(pay_grant, student.id, device_id, student.pay_password):
+        return True, None
+    if not pay_password:
+        return False, None
+    if not verify_password_attempt(f'pay:student:{student.id}', pay_password, student.pay_password, ip):
+        return False, None
+    return True, issue_pay_grant(student.id, device_id, student.pay_password)
+
 def student_register(data: dict):
     """学生注册业务逻辑"""
     encrypted_pwd = encrypt_password(data['password'])
@@ -17,16 +46,19 @@ def student_register(data: dict):
     db.session.commit()
     return new_student
 
-def student_login(login_id: str, password: str):
-    """学生登录（支持学号/手机号），返回具体错误信息"""
+def student_login(login_id: str, password: str, ip: str = None):
+    """学生登录（支持学号/手机号），返回具体错误信息（被限流或繁忙时附带 code）"""
     student = Student.query.filter_by(student_id=login_id).first() or \
               Student.query.filter_by(phone=login_id).first()
     if not student:
         return {'error': '用户不存在'}
     if not student.is_active:
         return {'error': '您的账号已被禁用'}
-    if not verify_password(password, student.password):
-        return {'error': '密码错误'}
+    try:
+        if not verify_password_attempt(f'student:{student.id}', password, student.password, ip):
+            return {'error': '密码错误'}
+    except PasswordCheckRejected as e:
+        return {'error': e.msg, 'code': e.code}
     return {
         'token': generate_token(student.id, 'student'),
         'user_info': {
@@ -56,13 +88,16 @@ def merchant_register(data: dict):
     db.session.commit()
     return new_merchant
 
-def merchant_login(phone: str, password: str):
-    """商户登录，返回具体错误信息"""
+def merchant_login(phone: str, password: str, ip: str = None):
+    """商户登录，返回具体错误信息（被限流或繁忙时附带 code）"""
     merchant = Merchant.query.filter_by(contact_phone=phone).first()
     if not merchant:
         return {'error': '用户不存在'}
-    if not verify_password(password, merchant.password):
-        return {'error': '密码错误'}
+    try:
+        if not verify_password_attempt(f'merchant:{merchant.id}', password, merchant.password, ip):
+            return {'error': '密码错误'}
+    except PasswordCheckRejected as e:
+        return {'error': e.msg, 'code': e.code}
     return {
         'token': generate_token(merchant.id, 'merchant'),
         'user_info': {
@@ -0,0 +1,51 @@
+from datetime import datetime
+from extensions import db
+from models.coupon import Coupon, UserCoupon
+
+def issue_coupons_after_payment(student_id: int, merchant_id: int) -> int:
+    """支付成功后为学生发放商户当前可领的优惠券，返回新发放数量，不提交事务
+
+    固定两次查询：一次取出候选优惠券（已激活、在有效期内、未用完），
+    一次用 IN 查询学生已领取的记录，未领取的批量插入。
+    """
+    current_time = datetime.now()
+    candidate_ids = [coupon_id for coupon_id, in db.session.query(Coupon.id).filter(
+        Coupon.merchant_id == merchant_id,
+        Coupon.is_active == True,
+        Coupon.start_time <= current_time,
+        Coupon.end_time >= current_time,
+        Coupon.used < Coupon.total
+    ).all()]
+    if not candidate_ids:
+        return 0
+
+    claimed_ids = {coupon_id for coupon_id, in db.session.query(UserCoupon.coupon_id).filter(
+        UserCoupon.student_id == student_id,
+        UserCoupon.coupon_id.in_(candidate_ids)
+    ).all()}
+
+    new_coupons = [
+        UserCoupon(student_id=student_id, coupon_id=coupon_id)
+        for coupon_id in candidate_ids if coupon_id not in claimed_ids
+    ]
+    db.session.add_all(new_coupons)
+    return len(new_coupons)
+
+def redeem_coupon(coupon_id: int) -> bool:
+    """优惠券使用次数加1；已达到总数量时不更新并返回 False，不提交事务
+
+    使用带条件的 UPDATE 保证并发支付时 used 不会超过 total
+    """
+    updated = Coupon.query.filter(
+        Coupon.id == coupon_id,
+        Coupon.used < Coupon.total
+    ).update({Coupon.used: Coupon.used + 1}, synchronize_session=False)
+    return updated > 0
+
+def release_coupon(coupon_id: int) -> bool:
+    """订单取消时优惠券使用次数减1（不会减为负数），不提交事务"""
+    updated = Coupon.query.filter(
+        Coupon.id == coupon_id,
+        Coupon.used > 0
+    ).update({Coupon.used: Coupon.used - 1}, synchronize_session=False)
+    return updated > 0
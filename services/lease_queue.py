@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from config import Config
+from extensions import db
+
+# 数据库任务队列的公共部分（发件箱事件、通知消息共用）：
+# 批量领取到期的记录并加租约（多进程同时轮询时不会重复领取，处理进程异常退出后租约到期可被重新领取），
+# 处理成功后批量标记完成，失败按尝试次数退避重试，超过最大次数标记为失败。
+# 队列表需有 status / attempts / available_at / last_error 字段
+
+class LeaseQueue:
+    """基于租约的数据库任务队列
+
+    config_prefix 对应 Config 中的 {prefix}_LEASE_SECONDS / {prefix}_MAX_ATTEMPTS / {prefix}_RETRY_SECONDS
+    """
+
+    def __init__(self, model, config_prefix: str, pending: str, running: str, done: str,
+                 done_time_field: str, failed: str = '失败'):
+        self.model = model
+        self.config_prefix = config_prefix
+        self.pending = pending
+        self.running = running
+        self.done = done
+        self.failed = failed
+        self.done_time_field = done_time_field
+
+    def _config(self, name: str):
+        return getattr(Config, f'{self.config_prefix}_{name}')
+
+    def _claimable(self, now: datetime):
+        """可领取的条件：待处理，或处理中但租约已过期"""
+        return (
+            self.model.status.in_([self.pending, self.running]),
+            self.model.available_at <= now
+        )
+
+    def claim(self, batch_size: int, now: datetime = None) -> list:
+        """领取一批到期的记录并提交，返回领取到的记录（按 id 排序）"""
+        now = now or datetime.now()
+        model = self.model
+        ids = [row_id for row_id, in db.session.query(model.id).filter(
+            *self._claimable(now)
+        ).order_by(model.id).limit(batch_size).all()]
+        if not ids:
+            return []
+
+        # 以租约到期时间作为本次领取的标记，领取后在租约时间内不会被再次领取
+        lease_until = now + timedelta(seconds=self._config('LEASE_SECONDS'))
+        model.query.filter(model.id.in_(ids), *self._claimable(now)).update({
+            model.status: self.running,
+            model.attempts: model.attempts + 1,
+            model.available_at: lease_until
+        }, synchronize_session=False)
+        db.session.commit()
+
+        return model.query.filter(
+            model.id.in_(ids),
+            model.status == self.running,
+            model.available_at == lease_until
+        ).order_by(model.id).all()
+
+    def complete(self, ids):
+        """标记处理完成并提交"""
+        model = self.model
+        model.query.filter(model.id.in_(list(ids))).update({
+            model.status: self.done,
+            getattr(model, self.done_time_field): datetime.now(),
+            model.last_error: None
+        }, synchronize_session=False)
+        db.session.commit()
+
+    def fail(self, ids, error: Exception):
+        """记录失败并提交：按尝试次数退避重试，超过最大次数标记为失败"""
+        max_attempts = self._config('MAX_ATTEMPTS')
+        retry_seconds = self._config('RETRY_SECONDS')
+        for item in self.model.query.filter(self.model.id.in_(list(ids))).all():
+            item.last_error = str(error)
+            if item.attempts >= max_attempts:
+                item.status = self.failed
+            else:
+                item.status = self.pending
+                item.available_at = datetime.now() + timedelta(seconds=retry_seconds * item.attempts)
+        db.session.commit()
@@ -0,0 +1,43 @@
+from sqlalchemy import func
+from extensions import db
+from models.merchant import Merchant
+from models.dish import Dish
+
+def list_merchants(page: int = None, page_size: int = 10, is_open: bool = None):
+    """商户目录：一次分组查询返回已审核商户及其总售出量
+
+    总售出量为商户名下所有菜品销量计数之和；传入 page 时分页，返回 (rows, total)，
+    不分页时 total 为 None。
+    """
+    total_sales = func.coalesce(func.sum(Dish.sales), 0).label('total_sales')
+    query = db.session.query(
+        Merchant.id,
+        Merchant.merchant_name,
+        Merchant.address,
+        Merchant.contact_phone,
+        Merchant.logo,
+        Merchant.description,
+        Merchant.is_open,
+        total_sales
+    ).outerjoin(
+        Dish, Dish.merchant_id == Merchant.id
+    ).filter(
+        Merchant.status == 1  # 只显示已通过审核的
+    )
+
+    if is_open is not None:
+        query = query.filter(Merchant.is_open == is_open)
+
+    query = query.group_by(Merchant.id).order_by(Merchant.id)
+
+    if not page:
+        return query.all(), None
+
+    # 分页时总数只统计商户表，不需要关联菜品
+    count_query = Merchant.query.filter(Merchant.status == 1)
+    if is_open is not None:
+        count_query = count_query.filter(Merchant.is_open == is_open)
+    total = count_query.count()
+
+    rows = query.offset((page - 1) * page_size).limit(page_size).all()
+    return rows, total
@@ -0,0 +1,188 @@
+import heapq
+import threading
+from datetime import datetime, timedelta
+from extensions import db, scheduler
+from models.merchant import Merchant
+from utils.business_hours import parse_business_hours
+from utils.logger import get_logger
+
+logger = get_logger('merchant')
+
+# 营业状态调度：每个商户的营业时间只解析一次，用最小堆保存各商户下一次开店/打烊的时间点，
+# 只在切换时刻触发一次定时任务，用 UPDATE 批量更新到点的商户；修改营业时间后重新调度。
+# 堆只在调度器所在进程内维护（debug 模式下请求由 reloader 子进程处理），因此：
+#   - 到点切换前从数据库重新读取到点商户的营业时间，不使用可能过期的缓存；
+#   - 每分钟按 hours_update_time 拉取最近修改过营业时间的商户（sync_changed_merchants）；
+#   - 低频的全量校准（resync_merchant_status）兜底。
+
+TRANSITION_JOB_ID = 'merchant_status_transition'
+
+_heap = []  # (切换时间, 商户ID, 版本号)
+_versions = {}  # 商户ID -> 最新版本号，重新调度后堆中的旧条目作废
+_hours = {}  # 商户ID -> 解析后的营业时间（BusinessHours），无营业时间或格式错误时为 None
+_synced_until = None  # 已同步的营业时间修改时间（hours_update_time 的最大值）
+_SYNC_OVERLAP = timedelta(seconds=5)  # 同步时回看的时长，覆盖修改时间早于提交时间的事务
+_lock = threading.RLock()
+
+def is_open_at(hours, now: datetime) -> bool:
+    """按解析后的营业时间判断指定时刻是否营业，未设置营业时间（None）视为营业中"""
+    return True if hours is None else hours.is_open_at(now)
+
+def next_transition(hours, now: datetime):
+    """返回 now 之后下一次营业状态切换的时间点，不会切换时返回 None"""
+    return None if hours is None else hours.next_transition(now)
+
+def _push(merchant_id: int, hours, now: datetime):
+    """记录商户营业时间并把下一次切换放入堆中（调用方持有锁）"""
+    version = _versions.get(merchant_id, 0) + 1
+    _versions[merchant_id] = version
+    _hours[merchant_id] = hours
+    when = next_transition(hours, now)
+    if when is not None:
+        heapq.heappush(_heap, (when, merchant_id, version))
+
+def _arm():
+    """按堆顶时间设置（或移除）切换任务（调用方持有锁）"""
+    # 丢弃已作废的堆顶条目
+    while _heap and _versions.get(_heap[0][1]) != _heap[0][2]:
+        heapq.heappop(_heap)
+    if not scheduler.running:
+        return
+    if not _heap:
+        if scheduler.get_job(TRANSITION_JOB_ID):
+            scheduler.remove_job(TRANSITION_JOB_ID)
+        return
+    scheduler.add_job(
+        func=_transition_job,
+        trigger='date',
+        run_date=_heap[0][0],
+        id=TRANSITION_JOB_ID,
+        misfire_grace_time=None,  # 错过切换时间（如进程暂停）也要执行，否则调度链会中断
+        replace_existing=True
+    )
+
+def _apply_statuses(statuses: dict) -> int:
+    """按目标状态分组批量更新 is_open（每个状态一条 UPDATE，只更新状态不一致的商户），不提交事务"""
+    updated = 0
+    for is_open in (True, False):
+        ids = [merchant_id for merchant_id, status in statuses.items() if status == is_open]
+        if ids:
+            updated += Merchant.query.filter(
+                Merchant.id.in_(ids),
+                Merchant.is_open != is_open
+            ).update({Merchant.is_open: is_open}, synchronize_session=False)
+    return updated
+
+def run_due_transitions(now: datetime = None) -> int:
+    """处理已到切换时间的商户：批量更新营业状态并调度各自的下一次切换，返回更新的商户数"""
+    now = now or datetime.now()
+    with _lock:
+        due = []
+        while _heap and _heap[0][0] <= now:
+            when, merchant_id, version = heapq.heappop(_heap)
+            if _versions.get(merchant_id) == version:
+                due.append(merchant_id)
+
+        # 按数据库中当前的营业时间计算（可能已被其他进程修改），已删除的商户不再调度
+        current = dict(
+            db.session.query(Merchant.id, Merchant.business_hours).filter(Merchant.id.in_(due)).all()
+        ) if due else {}
+        statuses = {}
+        for merchant_id in due:
+            if merchant_id not in current:
+                _versions[merchant_id] += 1
+                _hours.pop(merchant_id, None)
+                continue
+            hours = parse_business_hours(current[merchant_id])
+            statuses[merchant_id] = is_open_at(hours, now)
+            _push(merchant_id, hours, now)
+
+        updated = 0
+        if statuses:
+            try:
+                updated = _apply_statuses(statuses)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.exception('营业状态切换更新失败', extra={'fields': {'merchant_ids': list(statuses)}})
+        _arm()
+    return updated
+
+def _transition_job():
+    """切换任务：在应用上下文中处理到点的商户"""
+    with scheduler.app.app_context():
+        run_due_transitions()
+
+def schedule_merchant(merchant_id: int, business_hours: str, now: datetime = None):
+    """商户营业时间变更后重新调度其下一次切换（不修改数据库）"""
+    now = now or datetime.now()
+    with _lock:
+        _push(merchant_id, parse_business_hours(business_hours), now)
+        _arm()
+
+def unschedule_merchant(merchant_id: int):
+    """商户删除后移除其调度"""
+    with _lock:
+        _versions[merchant_id] = _versions.get(merchant_id, 0) + 1
+        _hours.pop(merchant_id, None)
+        _arm()
+
+def sync_changed_merchants(now: datetime = None) -> int:
+    """同步上次同步以来修改过营业时间的商户：修正营业状态并重新调度，返回更新的商户数"""
+    global _synced_until
+    now = now or datetime.now()
+    query = db.session.query(Merchant.id, Merchant.business_hours, Merchant.hours_update_time).filter(
+        Merchant.hours_update_time.isnot(None)
+    )
+    if _synced_until is not None:
+        query = query.filter(Merchant.hours_update_time >= _synced_until - _SYNC_OVERLAP)
+    rows = query.all()
+    if not rows:
+        return 0
+
+    with _lock:
+        statuses = {}
+        for merchant_id, business_hours, update_time in rows:
+            hours = parse_business_hours(business_hours)
+            statuses[merchant_id] = is_open_at(hours, now)
+            _push(merchant_id, hours, now)
+            _synced_until = max(_synced_until or update_time, update_time)
+
+        try:
+            updated = _apply_statuses(statuses)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            _arm()
+    return updated
+
+def resync_merchant_status(now: datetime = None) -> int:
+    """全量校准：按营业时间修正所有商户的营业状态并重建调度堆，返回更新的商户数
+
+    启动时执行一次，之后低频执行，用于纳入其他进程修改的营业时间
+    """
+    global _synced_until
+    now = now or datetime.now()
+    rows = db.session.query(Merchant.id, Merchant.business_hours, Merchant.hours_update_time).all()
+    with _lock:
+        _heap.clear()
+        _hours.clear()
+        statuses = {}
+        for merchant_id, business_hours, update_time in rows:
+            hours = parse_business_hours(business_hours)
+            statuses[merchant_id] = is_open_at(hours, now)
+            _push(merchant_id, hours, now)
+            if update_time is not None:
+                _synced_until = max(_synced_until or update_time, update_time)
+
+        try:
+            updated = _apply_statuses(statuses)
+            if updated:
+                db.session.commit()
+            else:
+                db.session.rollback()
+        finally:
+            _arm()
+    return updated
@@ -1,4 +1,133 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from sqlalchemy import insert
+from config import Config
+from extensions import db
+from models.notification import NotificationMessage
+from services.lease_queue import LeaseQueue
+from utils.logger import get_logger
+
+logger = get_logger('notification')
+
+# 通知子系统：业务请求只在自身事务中写入通知队列（一条 INSERT），不等待发送；
+# 后台任务按接收人合并待发送消息，通过配置的发送通道（Config.NOTIFICATION_TRANSPORT）批量发出，
+# 失败按退避时间重试。接入真实短信服务时实现 NotificationTransport 并用 register_transport 注册即可
+
+class NotificationTransport(ABC):
+    """通知发送通道接口"""
+
+    @abstractmethod
+    def send(self, recipient: str, messages: list):
+        """把发给同一接收人的多条消息一次发出，发送失败时抛出异常"""
+
+class ConsoleTransport(NotificationTransport):
+    """输出到控制台（开发调试用）"""
+
+    def send(self, recipient: str, messages: list):
+        for message in messages:
+            print(f"【通知】用户{recipient}：{message}")
+
+class FileTransport(NotificationTransport):
+    """追加写入本地文件（每次发送一行 JSON），作为短信服务的本地替身"""
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.NOTIFICATION_FILE
+
+    def send(self, recipient: str, messages: list):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        line = json.dumps({
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'recipient': recipient,
+            'messages': messages
+        }, ensure_ascii=False)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+# 通知队列：领取、租约和失败重试由 LeaseQueue 处理
+_queue = LeaseQueue(
+    NotificationMessage, 'NOTIFICATION',
+    pending='待发送', running='发送中', done='已发送', done_time_field='sent_time'
+)
+
+# 发送通道名称 -> 创建通道的函数
+_transport_factories = {
+    'console': ConsoleTransport,
+    'file': FileTransport
+}
+_transport = None
+
+def register_transport(name: str, factory):
+    """注册发送通道（factory 无参数调用后返回 NotificationTransport 实例）"""
+    global _transport
+    _transport_factories[name] = factory
+    _transport = None
+
+def get_transport() -> NotificationTransport:
+    """按 Config.NOTIFICATION_TRANSPORT 获取发送通道（进程内只创建一次）"""
+    global _transport
+    if _transport is None:
+        factory = _transport_factories.get(Config.NOTIFICATION_TRANSPORT)
+        if factory is None:
+            raise ValueError(f'未注册的通知发送通道：{Config.NOTIFICATION_TRANSPORT}')
+        _transport = factory()
+    return _transport
+
+def format_order_notification(order_no: str, status: str) -> str:
+    """订单状态通知内容"""
+    return f"您的订单{order_no}状态更新为：{status}"
+
 def send_order_notification(phone: str, order_no: str, status: str):
-    """模拟发送订单通知（实际应对接短信API）"""
-    print(f"【通知】用户{phone}的订单{order_no}状态更新为：{status}")
-    return True
\ No newline at end of file
+    """立即发送订单通知（同步模式下使用）"""
+    get_transport().send(phone, [format_order_notification(order_no, status)])
+    return True
+
+def notify_order(phone: str, order_no: str, status: str):
+    """订单状态通知：异步模式下写入通知队列（需调用方提交），否则直接发送"""
+    notify_orders([(phone, order_no, status)])
+
+def notify_orders(notifications):
+    """批量订单状态通知，notifications 为 (手机号, 订单号, 状态) 列表；异步模式下一条 INSERT 写入通知队列（需调用方提交）"""
+    if not notifications:
+        return
+    if not Config.NOTIFICATION_ASYNC:
+        for phone, order_no, status in notifications:
+            send_order_notification(phone, order_no, status)
+        return
+    now = datetime.now()
+    db.session.execute(insert(NotificationMessage), [
+        {
+            'recipient': phone,
+            'category': 'order_status',
+            'content': format_order_notification(order_no, status),
+            'status': '待发送',
+            'attempts': 0,
+            'available_at': now,
+            'create_time': now
+        }
+        for phone, order_no, status in notifications
+    ])
+
+def dispatch_notifications(batch_size: int = None) -> int:
+    """发送一批待发送的通知：同一接收人的多条消息合并为一次发送，返回发送成功的消息数"""
+    batch_size = batch_size or Config.NOTIFICATION_BATCH_SIZE
+    messages = _queue.claim(batch_size)
+
+    by_recipient = {}
+    for message in messages:
+        by_recipient.setdefault(message.recipient, []).append(message)
+
+    transport = get_transport()
+    sent = 0
+    for recipient, group in by_recipient.items():
+        ids = [message.id for message in group]
+        try:
+            transport.send(recipient, [message.content for message in group])
+        except Exception as e:
+            logger.exception('通知发送失败', extra={'fields': {'recipient': recipient, 'message_ids': ids}})
+            _queue.fail(ids, e)
+            continue
+        _queue.complete(ids)
+        sent += len(group)
+    return sent
@@ -0,0 +1,36 @@
+from sqlalchemy.orm import selectinload
+from models.order import Order, OrderItem
+
+# 订单列表/详情的公共加载与序列化：订单项通过 selectinload 批量加载，
+# 菜品名称和图片读取下单时的快照，不再关联菜品表，一页订单无论多少条订单项，查询次数都是固定的
+
+def with_items(query, load_dishes: bool = False):
+    """为订单查询附加订单项的批量加载；load_dishes=True 时一并批量加载关联菜品"""
+    loader = selectinload(Order.order_items)
+    if load_dishes:
+        loader = loader.selectinload(OrderItem.dish)
+    return query.options(loader)
+
+def item_dish_name(item) -> str:
+    """订单项的菜品名称：优先使用下单时的快照"""
+    if item.dish_name:
+        return item.dish_name
+    # 快照缺失时回退到关联菜品（需配合 load_dishes=True 以避免逐条查询）
+    return item.dish.dish_name if item.dish else '未知菜品'
+
+def item_img_url(item) -> str:
+    """订单项的菜品图片：优先使用下单时的快照"""
+    if item.img_url:
+        return item.img_url
+    return item.dish.img_url if item.dish else None
+
+def order_item_dicts(order) -> list:
+    """订单项序列化（学生端、商户端订单列表/详情共用）"""
+    return [{
+        'id': item.id,
+        'dish_id': item.dish_id,
+        'dish_name': item_dish_name(item),
+        'img_url': item_img_url(item),
+        'quantity': item.quantity,
+        'price': item.price
+    } for item in order.order_items]
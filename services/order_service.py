@@ -7,8 +7,15 @@ from models.merchant import Merchant
 from models.platform_config import PlatformConfig
 from models.coupon import Coupon, UserCoupon
 from models.dish import Dish
+from services.stats_rollup_service import record_order_paid
+from services.coupon_service import redeem_coupon, issue_coupons_after_payment
+from services.outbox_service import enqueue
+from config import Config
+from utils.logger import get_logger
 from app import db
 
+logger = get_logger('order')
+
 def create_order(student_id: int, merchant_id: int, address_id: int, remark: str = '', coupon = None, cart_item_ids=None, status='待支付', user_coupon=None):
     """从购物车创建订单"""
     # 获取地址信息
@@ -36,8 +43,7 @@ def create_order(student_id: int, merchant_id: int, address_id: int, remark: str
     dish_total = sum(item.dish.price * item.quantity for item in cart_items)
     
     # 获取配送费（从PlatformConfig表获取）
-    config = PlatformConfig.get_by_key('default_delivery_fee')
-    delivery_fee = float(config.config_value) if config else 5.0  # 默认5元
+    delivery_fee = PlatformConfig.get_default_delivery_fee()  # 未配置时默认5元
     
     # 计算总金额（菜品总价 + 配送费）
     total_amount = dish_total + delivery_fee
@@ -64,9 +70,11 @@ def create_order(student_id: int, merchant_id: int, address_id: int, remark: str
             
             # 使用优惠券后更新状态
             if user_coupon and status != '待支付':  # 只有当订单支付成功时才使用优惠券
+                # 带条件更新使用次数，使用次数不会超过总数量
+                if not redeem_coupon(coupon.id):
+                    raise ValueError("优惠券已被抢光，无法使用")
                 user_coupon.is_used = True
                 user_coupon.use_time = datetime.now()
-                coupon.used += 1
     
     # 生成订单号
     order_no = f"ORD{datetime.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:8].upper()}"
@@ -89,12 +97,15 @@ def create_order(student_id: int, merchant_id: int, address_id: int, remark: str
     db.session.flush()  # 获取order.id
     
     # 创建订单项
+    stock_changes = []
     for item in cart_items:
         order_item = OrderItem(
             order_id=order.id,
             dish_id=item.dish_id,
             quantity=item.quantity,
-            price=item.dish.price
+            price=item.dish.price,
+            dish_name=item.dish.dish_name,
+            img_url=item.dish.img_url
         )
         db.session.add(order_item)
         # 清空购物车
@@ -105,16 +116,21 @@ def create_order(student_id: int, merchant_id: int, address_id: int, remark: str
             # 获取菜品信息
             dish = Dish.query.get(item.dish_id)
             if dish and dish.stock != 0:  # 库存为0表示无限库存，不做处理
+                old_stock = dish.stock
                 # 当前库存等于订单数量时，支付成功后直接变为-1
                 if dish.stock == item.quantity:
                     dish.stock = -1
                 else:
                     # 其他情况下库存减去订单数量
                     dish.stock -= item.quantity
-                print(f"订单创建时，菜品 {dish.dish_name} 库存更新：原库存 {dish.stock + item.quantity}，订单数量 {item.quantity}，新库存 {dish.stock}")
+                stock_changes.append({'dish_id': dish.id, 'old_stock': old_stock, 'new_stock': dish.stock})
     
     # 如果订单状态不是待支付，说明已经支付，需要给商户钱包加钱
     if status != '待支付':
+        # 创建即支付的订单同样记录支付时间，并计入商户经营汇总
+        order.pay_time = datetime.now()
+        record_order_paid(order)
+        
         # 获取对应商户
         merchant = Merchant.query.get(merchant_id)
         if merchant:
@@ -122,59 +138,35 @@ def create_order(student_id: int, merchant_id: int, address_id: int, remark: str
             merchant_earnings = float(pay_amount) - delivery_fee
             
             # 给商户钱包加上对应菜品的价值（不含配送费）
-            old_balance = float(merchant.wallet)
-            merchant.wallet = old_balance + merchant_earnings
-            new_balance = float(merchant.wallet)
-            print(f"订单创建时，商户 {merchant.merchant_name} 钱包金额增加：{merchant_earnings}，原余额：{old_balance}，新余额：{new_balance}")
-    
-        # 更新平台配送费收入
-        current_earnings = PlatformConfig.get_delivery_fee_earnings()
-        new_earnings = current_earnings + float(delivery_fee)
-        PlatformConfig.update_delivery_fee_earnings(new_earnings)
-        
-        # 添加配送费收入日志
-        print(f"订单创建时，平台配送费收入增加：{delivery_fee}，原收入：{current_earnings}，新收入：{new_earnings}")
+            merchant.wallet = float(merchant.wallet) + merchant_earnings
+    
+        # 记录平台配送费收入流水（只追加，随订单事务一起提交）
+        PlatformConfig.add_delivery_fee_earnings(delivery_fee, 'payment', order_id=order.id)
     
-    # 发放优惠券
+    # 发放优惠券（批量查询、批量插入）；异步模式下写入发件箱事件，由后台任务处理
     coupons_added = 0
-    if status == '待接单':
+    if status == '待接单' and Config.OUTBOX_ASYNC:
+        enqueue('coupon.issue', student_id=student_id, merchant_id=merchant_id)
+    elif status == '待接单':
         try:
-            # 查询商户的所有已激活且在有效期内的优惠券
-            current_time = datetime.now()
-            active_coupons = Coupon.query.filter_by(
-                merchant_id=merchant_id,
-                is_active=True
-            ).filter(
-                Coupon.start_time <= current_time,
-                Coupon.end_time >= current_time
-            ).all()
-            
-            # 为学生发放符合条件的优惠券
-            coupons_to_add = []
-            for coupon in active_coupons:
-                # 检查学生是否已领取过该优惠券
-                existing = UserCoupon.query.filter_by(
-                    student_id=student_id,
-                    coupon_id=coupon.id
-                ).first()
-                
-                # 如果未领取，且优惠券还有剩余数量
-                if not existing and coupon.used < coupon.total:
-                    # 创建用户优惠券记录
-                    user_coupon = UserCoupon(
-                        student_id=student_id,
-                        coupon_id=coupon.id
-                    )
-                    coupons_to_add.append(user_coupon)
-                    db.session.add(user_coupon)
-            
-            coupons_added = len(coupons_to_add)
+            coupons_added = issue_coupons_after_payment(student_id, merchant_id)
         except Exception as e:
             # 优惠券发放失败不影响订单创建，记录错误即可
-            import traceback
-            traceback.print_exc()
+            logger.exception('订单创建时发放优惠券失败', extra={'fields': {'order_id': order.id}})
     
     # 提交订单创建的事务
     db.session.commit()
     
+    # 每个订单只记录一条结构化日志
+    logger.info('订单创建成功', extra={'fields': {
+        'order_id': order.id,
+        'student_id': student_id,
+        'merchant_id': merchant_id,
+        'status': status,
+        'pay_amount': float(pay_amount),
+        'delivery_fee': float(delivery_fee),
+        'coupon_id': order.coupon_id,
+        'stock_changes': stock_changes
+    }})
+    
     return order, coupons_added
\ No newline at end of file
@@ -0,0 +1,115 @@
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
+from extensions import db
+from models.order import Order
+
+# 商户处理订单时允许的状态转换（当前状态 -> 可转换到的状态）
+STATUS_TRANSITIONS = {
+    '待支付': ['待接单', '已取消'],
+    '待接单': ['待配送', '已取消'],
+    '待配送': ['已送达'],
+    '已送达': [],
+    '已取消': []
+}
+VALID_STATUSES = list(STATUS_TRANSITIONS)
+
+def can_transition(current_status: str, new_status: str) -> bool:
+    """判断订单是否允许从当前状态转换到新状态"""
+    return new_status in STATUS_TRANSITIONS.get(current_status, [])
+
+def set_order_status(order, new_status: str, now: datetime = None):
+    """修改单个订单的状态（不提交事务）
+
+    商户把待支付订单改为待接单时视为已支付，补记支付时间：经营汇总的增量维护、扣回和重建
+    都以“有支付时间或处于支付后的状态”判断订单是否已支付，订单之后被取消时三者仍然一致
+    """
+    order.status = new_status
+    if new_status == '待接单' and order.pay_time is None:
+        order.pay_time = now or datetime.now()
+
+def _status_update_values(new_status: str, now: datetime) -> dict:
+    """批量 UPDATE 的字段值，与 set_order_status 一致（未记录支付时间的订单补记支付时间）"""
+    values = {Order.status: new_status}
+    if new_status == '待接单':
+        values[Order.pay_time] = func.coalesce(Order.pay_time, now)
+    return values
+
+def apply_transition_effects(orders, new_status: str):
+    """订单状态变更后的数据维护（菜品销量、商户经营汇总），不提交事务，不发送通知"""
+    from services import stats_rollup_service
+    from services.sales_service import add_orders_sales
+    if new_status == '已送达':
+        add_orders_sales(orders)
+    for order in orders:
+        if new_status == '待接单':
+            stats_rollup_service.record_order_paid(order)
+        elif new_status == '已送达':
+            stats_rollup_service.record_order_delivered(order)
+        elif new_status == '已取消':
+            stats_rollup_service.record_order_cancelled(order)
+
+def batch_update_order_status(merchant_id: int, changes):
+    """批量修改商户订单状态，changes 为 [(订单ID, 目标状态)]，返回 (更新数量, 错误列表)
+
+    全部校验通过才会执行：同一事务内每组（原状态, 目标状态）一条 UPDATE，销量、汇总和通知随之一起提交；
+    有任何一项不合法（或在此期间被其他请求改变了状态）时整体不生效，错误列表说明每个失败的订单
+    """
+    errors = []
+    targets = {}
+    for order_id, new_status in changes:
+        if new_status not in VALID_STATUSES:
+            errors.append({'order_id': order_id, 'message': '无效的订单状态'})
+        elif order_id in targets:
+            errors.append({'order_id': order_id, 'message': '订单重复'})
+        else:
+            targets[order_id] = new_status
+    if errors:
+        return 0, errors
+
+    orders = Order.query.options(
+        joinedload(Order.student),
+        selectinload(Order.order_items)
+    ).filter(
+        Order.merchant_id == merchant_id,
+        Order.id.in_(list(targets))
+    ).all()
+    orders_by_id = {order.id: order for order in orders}
+
+    groups = {}  # (校验时的状态, 目标状态) -> 订单列表
+    for order_id, new_status in targets.items():
+        order = orders_by_id.get(order_id)
+        if not order:
+            errors.append({'order_id': order_id, 'message': '订单不存在'})
+        elif not can_transition(order.status, new_status):
+            errors.append({'order_id': order_id, 'message': f'状态转换不允许：{order.status} -> {new_status}'})
+        else:
+            groups.setdefault((order.status, new_status), []).append(order)
+    if errors:
+        return 0, errors
+
+    from services.notification_service import notify_orders
+    try:
+        notifications = []
+        for (old_status, new_status), group in groups.items():
+            # 只更新仍处于校验时状态的订单，更新数量不一致说明有订单已被其他请求修改
+            # （如校验为 待支付->已取消 后订单被支付，不能再按可取消处理）
+            updated = Order.query.filter(
+                Order.merchant_id == merchant_id,
+                Order.id.in_([order.id for order in group]),
+                Order.status == old_status
+            ).update(_status_update_values(new_status, datetime.now()), synchronize_session=False)
+            if updated != len(group):
+                db.session.rollback()
+                return 0, [{'order_id': None, 'message': '部分订单状态已变化，请刷新后重试'}]
+
+            apply_transition_effects(group, new_status)
+            notifications.extend((order.student.phone, order.order_no, new_status) for order in group)
+
+        # 发送通知（异步模式下写入通知队列，随状态更新一起提交）
+        notify_orders(notifications)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(targets), []
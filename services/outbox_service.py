@@ -0,0 +1,68 @@
+import json
+from datetime import datetime
+from config import Config
+from extensions import db
+from models.outbox import OutboxEvent
+from services.lease_queue import LeaseQueue
+from utils.logger import get_logger
+
+logger = get_logger('outbox')
+
+# 发件箱：支付等请求只在自身事务中写入一条事件，发券等非关键操作由后台任务在提交后处理，
+# 事件与业务数据同事务提交，不会因进程退出而丢失；处理失败按退避时间重试，超过最大次数标记为失败
+
+# 事件类型 -> 处理函数
+_handlers = {}
+
+# 领取、租约和失败重试由 LeaseQueue 处理
+_queue = LeaseQueue(
+    OutboxEvent, 'OUTBOX',
+    pending='待处理', running='处理中', done='已完成', done_time_field='processed_time'
+)
+
+def handler(event_type: str):
+    """注册事件处理函数的装饰器，处理函数接收事件参数（关键字参数）"""
+    def decorator(func):
+        _handlers[event_type] = func
+        return func
+    return decorator
+
+def enqueue(event_type: str, **payload):
+    """写入一条待处理事件，只加入会话不提交，随调用方的业务事务一起提交"""
+    event = OutboxEvent(
+        event_type=event_type,
+        payload=json.dumps(payload, ensure_ascii=False),
+        status='待处理',
+        available_at=datetime.now()
+    )
+    db.session.add(event)
+    return event
+
+def process_outbox(batch_size: int = None) -> int:
+    """处理一批到期的事件，返回成功处理的数量
+
+    处理中状态的事件若租约已过期（处理进程异常退出），会被重新领取
+    """
+    batch_size = batch_size or Config.OUTBOX_BATCH_SIZE
+    processed = 0
+    for event in _queue.claim(batch_size):
+        event_id, event_type = event.id, event.event_type
+        func = _handlers.get(event_type)
+        try:
+            if func is None:
+                raise ValueError(f'未注册的事件类型：{event_type}')
+            func(**event.get_payload())
+            # 处理结果与完成标记一起提交
+            _queue.complete([event_id])
+            processed += 1
+        except Exception as e:
+            logger.exception('发件箱事件处理失败', extra={'fields': {'event_id': event_id, 'event_type': event_type}})
+            db.session.rollback()
+            _queue.fail([event_id], e)
+    return processed
+
+@handler('coupon.issue')
+def _issue_coupons(student_id: int, merchant_id: int):
+    """支付成功后发放商户优惠券"""
+    from services.coupon_service import issue_coupons_after_payment
+    issue_coupons_after_payment(student_id, merchant_id)
@@ -0,0 +1,41 @@
+from sqlalchemy import func
+from extensions import db
+from models.dish import Dish
+from models.order import Order, OrderItem
+
+def add_order_sales(order, sign: int = 1):
+    """订单送达时累加菜品销量（sign=-1 时用于扣回），不提交事务"""
+    add_orders_sales([order], sign)
+
+def add_orders_sales(orders, sign: int = 1):
+    """多个订单送达时累加菜品销量，每个菜品只更新一次，不提交事务"""
+    # 同一菜品可能出现在多个订单或同一订单的多个订单项中，先合并数量
+    quantities = {}
+    for order in orders:
+        for item in order.order_items:
+            quantities[item.dish_id] = quantities.get(item.dish_id, 0) + item.quantity
+
+    # 使用原子自增，避免并发送达时丢失更新
+    for dish_id, quantity in quantities.items():
+        Dish.query.filter_by(id=dish_id).update(
+            {Dish.sales: func.coalesce(Dish.sales, 0) + sign * quantity},
+            synchronize_session=False
+        )
+
+def rebuild_dish_sales():
+    """根据已送达订单重新计算所有菜品的销量（回填/修复用）"""
+    delivered_quantity = db.session.query(
+        func.coalesce(func.sum(OrderItem.quantity), 0)
+    ).join(
+        Order, Order.id == OrderItem.order_id
+    ).filter(
+        OrderItem.dish_id == Dish.id,
+        Order.status == '已送达'
+    ).scalar_subquery()
+
+    updated = db.session.query(Dish).update(
+        {Dish.sales: delivered_quantity},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return updated
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from extensions import db
+from models.order import Order
+from models.dish import Dish
+from models.merchant_stats import MerchantHourlyStats, MerchantDailyStats
+
+def get_merchant_statistics(merchant_id: int, days: int = 1) -> dict:
+    """商户统计看板数据
+
+    订单数、收入、售出菜品数读取小时/天级汇总表（今天最多24行、所选范围每天1行），
+    读取开销与订单历史规模无关；待处理订单数、在售菜品数是当前状态，用一次标量子查询取回。
+    """
+    # 近1天指的是今天（从今天凌晨0点开始）
+    # 近N天指的是从N-1天前的凌晨0点到现在（例如近3天是前天、昨天、今天）
+    today = datetime.now()
+    today_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
+    start_time = today_start - timedelta(days=days-1)
+
+    # 今天的小时级数据
+    hourly_sales = [0.0] * 24
+    hourly_orders = [0] * 24
+    hourly_rows = db.session.query(
+        MerchantHourlyStats.bucket, MerchantHourlyStats.order_count, MerchantHourlyStats.income
+    ).filter(
+        MerchantHourlyStats.merchant_id == merchant_id,
+        MerchantHourlyStats.bucket >= today_start,
+        MerchantHourlyStats.bucket < today_start + timedelta(days=1)
+    ).all()
+    for bucket, count, income in hourly_rows:
+        hourly_orders[bucket.hour] += count
+        hourly_sales[bucket.hour] += income
+
+    # 所选范围内的天级数据（包含今天）
+    daily_rows = db.session.query(
+        MerchantDailyStats.bucket,
+        MerchantDailyStats.order_count,
+        MerchantDailyStats.income,
+        MerchantDailyStats.dishes_sold
+    ).filter(
+        MerchantDailyStats.merchant_id == merchant_id,
+        MerchantDailyStats.bucket >= min(start_time, today_start).date()
+    ).all()
+    daily = {bucket.strftime('%Y-%m-%d'): (count, income, sold) for bucket, count, income, sold in daily_rows}
+
+    # 天级数据：所选范围内每天一个桶，没有订单的日期补0
+    today_key = today_start.strftime('%Y-%m-%d')
+    daily_labels = [(start_time + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(max(days, 0))]
+    daily_orders = [daily.get(label, (0, 0.0, 0))[0] for label in daily_labels]
+    daily_sales = [round(daily.get(label, (0, 0.0, 0))[1], 2) for label in daily_labels]
+    total_dishes_sold = sum(daily.get(label, (0, 0.0, 0))[2] for label in daily_labels)
+
+    today_orders, today_income, _ = daily.get(today_key, (0, 0.0, 0))
+
+    # 待处理订单数、在售菜品数合并为一次查询
+    pending_orders_subq = select(func.count(Order.id)).where(
+        Order.merchant_id == merchant_id,
+        Order.status.in_(['待接单', '制作中', '待配送'])
+    ).scalar_subquery()
+    active_dishes_subq = select(func.count(Dish.id)).where(
+        Dish.merchant_id == merchant_id,
+        Dish.is_shelf == True  # True表示在售
+    ).scalar_subquery()
+    pending_orders, active_dishes = db.session.execute(
+        select(pending_orders_subq, active_dishes_subq)
+    ).one()
+
+    return {
+        'total_orders': sum(daily_orders),
+        'total_income': round(sum(daily_sales), 2),
+        'pending_orders': pending_orders,
+        'total_dishes_sold': total_dishes_sold,
+        'today_orders': today_orders,
+        'today_income': round(today_income, 2),
+        'active_dishes': active_dishes,
+        'hourly_sales': [round(v, 2) for v in hourly_sales],
+        'hourly_orders': hourly_orders,
+        'daily_labels': daily_labels,
+        'daily_sales': daily_sales,
+        'daily_orders': daily_orders
+    }
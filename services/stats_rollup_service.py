@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, extract, case, or_
+from extensions import db
+from models.order import Order, OrderItem
+from models.merchant_stats import MerchantHourlyStats, MerchantDailyStats
+
+# 已支付订单：有支付时间，或处于支付后的状态（兼容早期创建时即支付、未记录支付时间的订单）
+PAID_STATUSES = ['待接单', '待配送', '已送达']
+
+def _buckets(create_time):
+    """订单所属的小时桶和日期桶"""
+    create_time = create_time or datetime.now()
+    return create_time.replace(minute=0, second=0, microsecond=0), create_time.date()
+
+def _upsert(model, merchant_id, bucket, deltas):
+    """按数据库方言构造“插入桶，已存在时累加”的单条语句（唯一约束 merchant_id + bucket）"""
+    values = dict(merchant_id=merchant_id, bucket=bucket, **deltas)
+    increments = {key: getattr(model, key) + value for key, value in deltas.items()}
+    dialect = db.session.get_bind(clause=model.__table__.insert()).dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        return insert(model).values(**values).on_duplicate_key_update(**increments)
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model).values(**values).on_conflict_do_update(
+        index_elements=['merchant_id', 'bucket'], set_=increments
+    )
+
+def _bump(order, **deltas):
+    """累加订单所在小时桶和日期桶的汇总值，不提交事务
+
+    使用数据库的 upsert（SQLite/PostgreSQL 的 ON CONFLICT，MySQL 的 ON DUPLICATE KEY UPDATE），
+    并发写入同一个新桶时不会因唯一约束冲突导致整个事务失败
+    """
+    hour_bucket, day_bucket = _buckets(order.create_time)
+    for model, bucket in ((MerchantHourlyStats, hour_bucket), (MerchantDailyStats, day_bucket)):
+        db.session.execute(_upsert(model, order.merchant_id, bucket, deltas))
+
+def record_order_paid(order, sign: int = 1):
+    """订单支付成功"""
+    _bump(order, paid_count=sign)
+
+def record_order_delivered(order, sign: int = 1):
+    """订单送达：计入订单数、收入和售出菜品数"""
+    dishes_sold = sum(item.quantity for item in order.order_items)
+    _bump(order, order_count=sign, income=sign * float(order.pay_amount or 0), dishes_sold=sign * dishes_sold)
+
+def record_order_cancelled(order, sign: int = 1):
+    """订单取消"""
+    _bump(order, cancel_count=sign)
+
+def remove_order_stats(order):
+    """订单被删除时，按其当前状态扣回已计入的汇总值"""
+    if order.pay_time is not None or order.status in PAID_STATUSES:
+        record_order_paid(order, sign=-1)
+    if order.status == '已送达':
+        record_order_delivered(order, sign=-1)
+    elif order.status == '已取消':
+        record_order_cancelled(order, sign=-1)
+
+def rebuild_merchant_stats():
+    """根据订单表重建全部小时/天级汇总（回填/修复用），返回小时桶数量"""
+    day = func.date(Order.create_time)
+    hour = extract('hour', Order.create_time)
+    delivered = Order.status == '已送达'
+    paid = or_(Order.pay_time.isnot(None), Order.status.in_(PAID_STATUSES))
+
+    order_rows = db.session.query(
+        Order.merchant_id, day, hour,
+        func.sum(case((delivered, 1), else_=0)),
+        func.sum(case((delivered, Order.pay_amount), else_=0)),
+        func.sum(case((paid, 1), else_=0)),
+        func.sum(case((Order.status == '已取消', 1), else_=0))
+    ).group_by(Order.merchant_id, day, hour).all()
+
+    dish_rows = db.session.query(
+        Order.merchant_id, day, hour, func.sum(OrderItem.quantity)
+    ).join(
+        OrderItem, OrderItem.order_id == Order.id
+    ).filter(delivered).group_by(Order.merchant_id, day, hour).all()
+    dishes_sold = {(m, str(d), int(h)): int(qty or 0) for m, d, h, qty in dish_rows}
+
+    hourly = []
+    daily = {}
+    for merchant_id, d, h, order_count, income, paid_count, cancel_count in order_rows:
+        if d is None:
+            continue
+        day_bucket = datetime.strptime(str(d)[:10], '%Y-%m-%d').date()
+        values = {
+            'order_count': int(order_count or 0),
+            'income': float(income or 0),
+            'dishes_sold': dishes_sold.get((merchant_id, str(d), int(h)), 0),
+            'paid_count': int(paid_count or 0),
+            'cancel_count': int(cancel_count or 0)
+        }
+        hourly.append(dict(
+            merchant_id=merchant_id,
+            bucket=datetime.combine(day_bucket, datetime.min.time()) + timedelta(hours=int(h)),
+            **values
+        ))
+        day_values = daily.setdefault((merchant_id, day_bucket), dict.fromkeys(values, 0))
+        for key, value in values.items():
+            day_values[key] += value
+
+    MerchantHourlyStats.query.delete(synchronize_session=False)
+    MerchantDailyStats.query.delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(MerchantHourlyStats, hourly)
+    db.session.bulk_insert_mappings(MerchantDailyStats, [
+        dict(merchant_id=merchant_id, bucket=day_bucket, **values)
+        for (merchant_id, day_bucket), values in daily.items()
+    ])
+    db.session.commit()
+    return len(hourly)
@@ -0,0 +1,151 @@
+import re
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+# 商户营业时间：把营业时间字符串编译为一周内的营业区间（按秒），
+# 判断是否营业、计算下一次开店/打烊时间都只需一次二分查找。
+#
+# 格式（兼容原有的单时段写法 09:00-22:00）：
+#   多个时段用逗号分隔：10:00-14:00,17:00-22:00
+#   按星期设置用分号分隔，星期在前（1-7 表示周一至周日）：09:00-22:00;6-7 10:00-20:00
+#   未指定星期的规则作为默认规则，适用于其他规则未覆盖的日子；时段写“休息”表示当天不营业
+#   结束时间早于开始时间表示跨天营业（如 22:00-02:00）；营业到结束时刻为止（含结束时间当分钟的第 0 秒，
+#   与原有按时分秒比较的判断一致），如 09:00-22:00 在 22:00:00 仍营业、22:00:01 起休息
+
+MAX_LENGTH = 100  # 营业时间字符串的最大长度（与商户表 business_hours 字段长度一致）
+DAY_SECONDS = 24 * 3600
+WEEK_SECONDS = 7 * DAY_SECONDS
+CLOSED_MARK = '休息'
+
+_TIME_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})$')
+
+def _parse_time(text: str) -> int:
+    """解析 HH:MM，返回当天的秒数"""
+    match = _TIME_PATTERN.match(text)
+    if not match:
+        raise ValueError(f'时间格式不正确，应为HH:MM：{text}')
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if not (0 <= hour <= 23) or not (0 <= minute <= 59):
+        raise ValueError(f'时间超出有效范围：{text}')
+    return hour * 3600 + minute * 60
+
+def _parse_intervals(text: str):
+    """解析一天内的时段列表，返回 [(开始秒数, 结束秒数)]"""
+    if text == CLOSED_MARK:
+        return []
+    intervals = []
+    for part in text.split(','):
+        if part.count('-') != 1:
+            raise ValueError(f'营业时段格式不正确，应为开始时间-结束时间：{part}')
+        open_str, close_str = part.split('-')
+        intervals.append((_parse_time(open_str), _parse_time(close_str)))
+    return intervals
+
+def _parse_weekdays(text: str):
+    """解析星期（如 1-5 或 1,3,5），返回 0-6 的集合（0 为周一）"""
+    weekdays = set()
+    for part in text.split(','):
+        bounds = part.split('-')
+        if len(bounds) > 2 or not all(b.isdigit() and 1 <= int(b) <= 7 for b in bounds):
+            raise ValueError(f'星期格式不正确，应为1-7：{part}')
+        start, end = int(bounds[0]), int(bounds[-1])
+        if start > end:
+            raise ValueError(f'星期范围不正确：{part}')
+        weekdays.update(range(start - 1, end))
+    return weekdays
+
+def _seconds_of_week(t: datetime) -> int:
+    return t.weekday() * DAY_SECONDS + t.hour * 3600 + t.minute * 60 + t.second
+
+class BusinessHours:
+    """编译后的营业时间（不可变），通过 BusinessHours.parse 或带缓存的 parse_business_hours 创建"""
+
+    __slots__ = ('text', '_bounds', '_transitions')
+
+    def __init__(self, text: str, day_intervals):
+        """day_intervals: 长度为 7 的列表，依次为周一至周日的时段 [(开始秒数, 结束秒数)]"""
+        self.text = text
+
+        # 展开为一周内的半开区间 [开始, 结束)，结束时间当分钟的第 0 秒仍营业
+        segments = []
+        for day, intervals in enumerate(day_intervals):
+            for open_sec, close_sec in intervals:
+                start = day * DAY_SECONDS + open_sec
+                end = day * DAY_SECONDS + close_sec + 1
+                if close_sec < open_sec:
+                    end += DAY_SECONDS  # 跨天
+                if end > WEEK_SECONDS:
+                    # 周日跨到周一的部分折回周首
+                    segments.append((0, end - WEEK_SECONDS))
+                    end = WEEK_SECONDS
+                segments.append((start, end))
+
+        # 合并重叠的区间，_bounds 依次为 [开始, 结束, 开始, 结束, ...]
+        bounds = []
+        for start, end in sorted(segments):
+            if bounds and start <= bounds[-1]:
+                bounds[-1] = max(bounds[-1], end)
+            else:
+                bounds.extend([start, end])
+        self._bounds = bounds
+
+        # 状态真正发生变化的时间点（排除周日 24:00 与周一 00:00 首尾相接的边界）
+        self._transitions = sorted({
+            point % WEEK_SECONDS for point in bounds
+            if self._is_open_at_second(point % WEEK_SECONDS) != self._is_open_at_second((point - 1) % WEEK_SECONDS)
+        })
+
+    @classmethod
+    def parse(cls, text: str) -> 'BusinessHours':
+        """解析营业时间字符串，格式错误时抛出 ValueError"""
+        normalized = re.sub(r'\s*([-,;])\s*', r'\1', text.strip().replace('，', ',').replace('；', ';'))
+        if not normalized:
+            raise ValueError('营业时间不能为空')
+
+        default = None
+        day_intervals = [None] * 7
+        for rule in normalized.strip(';').split(';'):
+            parts = rule.split(None, 1)
+            if len(parts) == 1:
+                if default is not None:
+                    raise ValueError('只能设置一条不指定星期的默认营业时间')
+                default = _parse_intervals(parts[0])
+            else:
+                intervals = _parse_intervals(parts[1])
+                for day in _parse_weekdays(parts[0]):
+                    day_intervals[day] = intervals
+        return cls(text, [intervals if intervals is not None else (default or []) for intervals in day_intervals])
+
+    def _is_open_at_second(self, second: int) -> bool:
+        # 落在奇数位置之前说明处于某个 [开始, 结束) 区间内
+        return bisect_right(self._bounds, second) % 2 == 1
+
+    def is_open_at(self, t: datetime) -> bool:
+        """指定时刻是否营业"""
+        return self._is_open_at_second(_seconds_of_week(t))
+
+    def next_transition(self, t: datetime):
+        """t 之后下一次营业状态切换的时间点；全天候营业或始终休息时返回 None"""
+        if not self._transitions:
+            return None
+        second = _seconds_of_week(t)
+        index = bisect_right(self._transitions, second)
+        if index < len(self._transitions):
+            delta = self._transitions[index] - second
+        else:
+            delta = self._transitions[0] + WEEK_SECONDS - second
+        return t.replace(microsecond=0) + timedelta(seconds=delta)
+
+    def __repr__(self):
+        return f'<BusinessHours {self.text}>'
+
+@lru_cache(maxsize=1024)
+def parse_business_hours(text: str):
+    """带缓存的解析，相同字符串只编译一次；未设置或格式错误时返回 None（按营业中处理）"""
+    if not text or not text.strip():
+        return None
+    try:
+        return BusinessHours.parse(text)
+    except ValueError:
+        return None
@@ -0,0 +1,34 @@
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+# 读写分离：标记为只读的请求中，查询（SELECT）路由到只读库（SQLALCHEMY_BINDS['replica']），
+# 写入、刷新和原生 SQL 始终使用主库。只读库未配置时全部使用主库。
+# 只读请求中不要写入：只读库看不到本次会话中尚未提交的修改
+
+REPLICA_BIND_KEY = 'replica'
+
+class RoutingSession(Session):
+    """按请求的只读标记选择数据库连接的会话"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and is_read_only() and getattr(clause, 'is_select', False):
+            engine = self._db.engines.get(REPLICA_BIND_KEY)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def is_read_only() -> bool:
+    """当前请求是否标记为只读"""
+    return has_app_context() and g.get('db_read_only', False)
+
+def use_read_only():
+    """把当前请求标记为只读，可作为蓝图的 before_request 钩子，使整个蓝图的查询走只读库"""
+    g.db_read_only = True
+
+# 只读视图装饰器：视图中的查询走只读库
+def read_only(f):
+    def decorated_function(*args, **kwargs):
+        use_read_only()
+        return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
@@ -0,0 +1,43 @@
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+# 登录状态缓存：api_login_required 每次请求都要确认账号存在且未被禁用，
+# 在短时间内缓存这一结果即可省去查询；管理员禁用/删除账号时主动失效，其他进程最多延迟 TTL 秒生效
+
+# (user_type, user_id) -> (是否可用, 过期时间)；TTL 固定，按写入顺序排列即按过期时间排列，写入时从头部清理过期项，
+# 缓存大小只与 TTL 内活跃的账号数有关
+_active_flags = OrderedDict()
+_lock = threading.Lock()
+
+def get_active_flag(user_type: str, user_id: int):
+    """读取缓存的账号可用状态，未缓存或已过期返回 None"""
+    entry = _active_flags.get((user_type, user_id))
+    if entry is None:
+        return None
+    active, expires_at = entry
+    if time.monotonic() >= expires_at:
+        return None
+    return active
+
+def set_active_flag(user_type: str, user_id: int, active: bool):
+    """缓存账号可用状态（AUTH_ACTIVE_CACHE_TTL 为 0 时不缓存）"""
+    ttl = Config.AUTH_ACTIVE_CACHE_TTL
+    if ttl <= 0:
+        return
+    now = time.monotonic()
+    key = (user_type, user_id)
+    with _lock:
+        _active_flags[key] = (active, now + ttl)
+        _active_flags.move_to_end(key)
+        while _active_flags:
+            oldest_key, (_, expires_at) = next(iter(_active_flags.items()))
+            if expires_at > now:
+                break
+            del _active_flags[oldest_key]
+
+def invalidate_active_flag(user_type: str, user_id: int):
+    """账号状态变更（禁用、删除等）后调用，使缓存立即失效"""
+    with _lock:
+        _active_flags.pop((user_type, user_id), None)
@@ -0,0 +1,38 @@
+from flask import Response, current_app, stream_with_context
+from config import Config
+
+# 流式 JSON 响应：查询用 yield_per 分批从数据库读取，逐行序列化后分块写出（chunked 传输），
+# 不在内存中拼出完整的列表，导出/列表接口的内存占用与数据量无关。
+# 响应开始发送后状态码已固定为 200，中途出错只能断开连接，客户端会收到不完整的 JSON
+
+def iter_json_array(rows, serialize, chunk_bytes: int = None):
+    """把 rows 逐行 serialize 后编码为 JSON 数组片段，按 chunk_bytes 合并输出"""
+    chunk_bytes = chunk_bytes or Config.STREAM_CHUNK_BYTES
+    dumps = current_app.json.dumps
+    buffer, size = ['['], 1
+    for index, row in enumerate(rows):
+        part = (',' if index else '') + dumps(serialize(row))
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_bytes:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    buffer.append(']')
+    yield ''.join(buffer)
+
+def stream_json_response(query, serialize, envelope: dict = None, key: str = 'data') -> Response:
+    """以流式 JSON 返回查询结果：{...envelope, key: [serialize(row), ...]}
+
+    query 为 SQLAlchemy 查询，按 Config.STREAM_BATCH_SIZE 分批读取。
+    生成器在请求上下文中执行（stream_with_context），可继续使用 db.session。
+    """
+    envelope = dict(envelope or {'code': 200})
+    head = current_app.json.dumps(envelope)[:-1]
+    head += (', ' if envelope else '') + current_app.json.dumps(key) + ': '
+
+    def generate():
+        yield head
+        yield from iter_json_array(query.yield_per(Config.STREAM_BATCH_SIZE), serialize)
+        yield '}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
@@ -0,0 +1,77 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+# 应用日志：业务代码只把日志记录放入内存队列（不阻塞请求线程），
+# 由后台监听线程统一格式化为 JSON 写出；各模块日志级别可在 Config.LOG_LEVELS 中单独配置
+
+ROOT_LOGGER_NAME = 'campus_food'
+
+_listener = None
+
+class JsonFormatter(logging.Formatter):
+    """把日志记录格式化为一行 JSON，extra={'fields': {...}} 中的字段合并到输出中"""
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            data.update(fields)
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exc_info'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class _QueueHandler(QueueHandler):
+    """入队前只合并消息参数、把异常堆栈转为文本，堆栈不拼接到消息中，便于输出为单独的 JSON 字段"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def get_logger(name: str) -> logging.Logger:
+    """获取模块日志记录器，如 get_logger('payment') 对应 campus_food.payment"""
+    return logging.getLogger(f'{ROOT_LOGGER_NAME}.{name}')
+
+def setup_logging(config):
+    """初始化日志（每个进程只初始化一次）
+
+    config 需提供 LOG_LEVEL（默认级别）和 LOG_LEVELS（{模块名: 级别}）
+    """
+    global _listener
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.setLevel(getattr(config, 'LOG_LEVEL', 'INFO'))
+    for name, level in getattr(config, 'LOG_LEVELS', {}).items():
+        get_logger(name).setLevel(level)
+
+    if _listener is not None:
+        return
+
+    # 无界队列：写日志只是入队操作，实际的 I/O 在监听线程中完成
+    log_queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    root.addHandler(_QueueHandler(log_queue))
+    root.propagate = False
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # 进程退出前把队列中剩余的日志写完
+    atexit.register(_listener.stop)
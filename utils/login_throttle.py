@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import deque
+from config import Config
+from utils.password_utils import PasswordCheckRejected
+
+# 密码尝试限流：按账号统计时间窗口内的尝试次数、按IP统计失败次数，超过上限时在计算密码哈希前直接拒绝。
+# IP 只统计失败的校验，同一出口IP（校园网 NAT、反向代理）下大量正常登录/支付不会被误拦；
+# 部署在反向代理后时需设置 Config.TRUSTED_PROXY_COUNT，使 request.remote_addr 为真实客户端IP。
+# 计数保存在进程内存中，多进程部署时每个进程单独计数
+
+class LoginThrottled(PasswordCheckRejected):
+    """密码尝试次数过多"""
+    code = 429
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f'尝试次数过多，请{retry_after}秒后再试')
+
+_attempts = {}  # 限流键 -> 窗口内各次尝试的时间
+_lock = threading.Lock()
+_SWEEP_THRESHOLD = 10000
+
+def _prune(key, now, window):
+    attempts = _attempts.get(key)
+    while attempts and attempts[0] <= now - window:
+        attempts.popleft()
+    if attempts is not None and not attempts:
+        del _attempts[key]
+        return None
+    return attempts
+
+def _ip_limited(ip: str) -> bool:
+    """是否按IP限流（PASSWORD_ATTEMPTS_PER_IP 为 0 时关闭）"""
+    return bool(ip) and Config.PASSWORD_ATTEMPTS_PER_IP > 0
+
+def throttle_attempt(account_key: str, ip: str = None):
+    """记录一次账号的密码尝试；账号尝试次数或IP失败次数超过窗口内的上限时抛出 LoginThrottled（被拒绝的尝试不计数）
+
+    IP 在这里只检查不计数，校验失败后由调用方调用 record_failure 计入
+    """
+    window = Config.PASSWORD_ATTEMPT_WINDOW_SECONDS
+    account = f'account:{account_key}'
+    limits = [(account, Config.PASSWORD_ATTEMPTS_PER_ACCOUNT)]
+    if _ip_limited(ip):
+        limits.append((f'ip:{ip}', Config.PASSWORD_ATTEMPTS_PER_IP))
+
+    now = time.monotonic()
+    with _lock:
+        if len(_attempts) > _SWEEP_THRESHOLD:
+            # 清理已过期的记录，避免大量一次性IP占用内存
+            for key in list(_attempts):
+                _prune(key, now, window)
+        for key, limit in limits:
+            attempts = _prune(key, now, window)
+            if attempts is not None and len(attempts) >= limit:
+                raise LoginThrottled(max(1, int(attempts[0] + window - now) + 1))
+        _attempts.setdefault(account, deque()).append(now)
+
+def record_failure(ip: str = None):
+    """密码校验失败后计入IP的失败次数"""
+    if not _ip_limited(ip):
+        return
+    with _lock:
+        _attempts.setdefault(f'ip:{ip}', deque()).append(time.monotonic())
+
+def reset_account(account_key: str):
+    """密码校验成功后清除账号的尝试记录（IP 计数保留）"""
+    with _lock:
+        _attempts.pop(f'account:{account_key}', None)
@@ -0,0 +1,44 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+# 键集分页（keyset/seek）：按 (时间, id) 倒序排列，用上一页最后一行作为游标定位下一页，
+# 翻到多深都只扫描一页的数据，不会像 OFFSET 那样越翻越慢；新插入的数据也不会导致翻页重复或遗漏
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """把 (时间, id) 编码为不透明的游标字符串"""
+    payload = json.dumps([sort_value.isoformat() if sort_value else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str):
+    """解析游标，返回 (时间, id)；游标非法时抛出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        return (datetime.fromisoformat(sort_value) if sort_value else None), int(row_id)
+    except Exception:
+        raise ValueError('无效的分页游标')
+
+def keyset_paginate(query, sort_column, id_column, cursor: str = None, limit: int = 20):
+    """对查询按 (sort_column, id_column) 倒序做键集分页
+
+    返回 (本页数据, 下一页游标)；没有更多数据时下一页游标为 None。
+    查询结果的每一行需能通过列名取到排序字段和 id。
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < row_id)
+        ))
+
+    # 多取一条用于判断是否还有下一页
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+    items = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return items, next_cursor
@@ -1,4 +1,75 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import bcrypt
+from config import Config
+
+# 密码校验线程池：bcrypt 校验每次占用较多 CPU，统一放到并发数受限的专用线程池中执行，
+# 登录高峰时不会占满 CPU 拖慢其他接口；排队的校验请求超过上限时直接拒绝，不再继续堆积
+
+class PasswordCheckRejected(Exception):
+    """密码校验在计算哈希前被拒绝（排队已满、尝试次数过多等），code/msg 用于接口返回"""
+    code = 503
+    msg = '系统繁忙，请稍后再试'
+
+    def __init__(self, msg: str = None):
+        if msg:
+            self.msg = msg
+        super().__init__(self.msg)
+
+class PasswordHashBusy(PasswordCheckRejected):
+    """密码校验线程池排队已满"""
+
+_executor = None
+_slots = None  # 控制排队+执行中的请求总数
+_lock = threading.Lock()
+_stats = {'pending': 0, 'running': 0, 'rejected': 0, 'completed': 0}
+
+def _get_executor():
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _slots = threading.BoundedSemaphore(Config.PASSWORD_HASH_MAX_PENDING)
+                _executor = ThreadPoolExecutor(
+                    max_workers=Config.PASSWORD_HASH_WORKERS,
+                    thread_name_prefix='password-hash'
+                )
+    return _executor
+
+def _track_running(func, *args):
+    with _lock:
+        _stats['running'] += 1
+    try:
+        return func(*args)
+    finally:
+        with _lock:
+            _stats['running'] -= 1
+            _stats['completed'] += 1
+
+def _run_in_pool(func, *args):
+    """在密码线程池中执行并等待结果，排队已满时抛出 PasswordHashBusy"""
+    executor = _get_executor()
+    if not _slots.acquire(blocking=False):
+        with _lock:
+            _stats['rejected'] += 1
+        raise PasswordHashBusy()
+    with _lock:
+        _stats['pending'] += 1
+    try:
+        return executor.submit(_track_running, func, *args).result()
+    finally:
+        with _lock:
+            _stats['pending'] -= 1
+        _slots.release()
+
+def get_hash_pool_stats() -> dict:
+    """密码线程池运行指标：queued 为排队等待的校验数"""
+    with _lock:
+        stats = dict(_stats)
+    stats['queued'] = stats['pending'] - stats['running']
+    stats['workers'] = Config.PASSWORD_HASH_WORKERS
+    stats['max_pending'] = Config.PASSWORD_HASH_MAX_PENDING
+    return stats
 
 def encrypt_password(password: str) -> str:
     """加密密码"""
@@ -6,5 +77,5 @@ def encrypt_password(password: str) -> str:
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 def verify_password(password: str, encrypted_password: str) -> bool:
-    """验证密码"""
-    return bcrypt.checkpw(password.encode('utf-8'), encrypted_password.encode('utf-8'))
\ No newline at end of file
+    """验证密码（在密码线程池中执行），排队已满时抛出 PasswordHashBusy"""
+    return _run_in_pool(bcrypt.checkpw, password.encode('utf-8'), encrypted_password.encode('utf-8'))
@@ -0,0 +1,43 @@
+import base64
+import hashlib
+import hmac
+import time
+from flask import request
+from config import Config
+
+# 支付凭证：支付密码校验通过后签发的短期凭证，有效期内同一设备再次支付时出示凭证即可，
+# 不必每笔订单都重新计算支付密码哈希。凭证用 HMAC 签名，签名中包含设备标识和支付密码哈希的摘要，
+# 换设备或修改支付密码后原凭证立即失效
+
+def current_device_id() -> str:
+    """当前请求的设备标识：优先使用客户端上报的 X-Device-Id，否则使用 User-Agent"""
+    return request.headers.get('X-Device-Id') or request.user_agent.string or ''
+
+def _signature(student_id: int, expires_at: int, device_id: str, pay_password_hash: str) -> str:
+    message = '|'.join([
+        str(student_id),
+        str(expires_at),
+        hashlib.sha256(device_id.encode('utf-8')).hexdigest(),
+        hashlib.sha256(pay_password_hash.encode('utf-8')).hexdigest()
+    ])
+    return hmac.new(Config.SECRET_KEY.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).hexdigest()
+
+def issue_pay_grant(student_id: int, device_id: str, pay_password_hash: str) -> str:
+    """签发支付凭证，有效期为 Config.PAY_GRANT_TTL_SECONDS"""
+    expires_at = int(time.time()) + Config.PAY_GRANT_TTL_SECONDS
+    payload = base64.urlsafe_b64encode(f'{student_id}:{expires_at}'.encode('utf-8')).decode('ascii').rstrip('=')
+    return f'{payload}.{_signature(student_id, expires_at, device_id, pay_password_hash)}'
+
+def verify_pay_grant(token: str, student_id: int, device_id: str, pay_password_hash: str) -> bool:
+    """校验支付凭证：属于该学生、未过期、同一设备且签发后未修改支付密码"""
+    if not token or not pay_password_hash or '.' not in token:
+        return False
+    try:
+        payload, signature = token.split('.', 1)
+        padded = payload + '=' * (-len(payload) % 4)
+        grant_student_id, expires_at = map(int, base64.urlsafe_b64decode(padded).decode('utf-8').split(':'))
+    except (ValueError, UnicodeDecodeError):
+        return False
+    if grant_student_id != student_id or expires_at < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(student_id, expires_at, device_id, pay_password_hash))
@@ -0,0 +1,47 @@
+from sqlalchemy import text
+from extensions import db
+
+# 热点查询的执行计划检查：对主要接口使用的查询执行 EXPLAIN QUERY PLAN（SQLite），
+# 出现全表扫描（SCAN 表名，且未使用索引）时报告，用于确认模型中声明的索引生效
+
+def hot_queries():
+    """主要接口的查询形态，返回 [(名称, 查询)]；条件取值不影响执行计划"""
+    from models.order import Order, OrderItem
+    from models.comment import Comment
+    from models.complaint import Complaint
+    from models.dish import Dish
+    return [
+        ('商户订单列表', Order.query.filter(Order.merchant_id == 1).order_by(Order.create_time.desc())),
+        ('商户按状态筛选订单', Order.query.filter(Order.merchant_id == 1, Order.status == '待接单').order_by(Order.create_time.desc())),
+        ('学生订单列表', Order.query.filter(Order.student_id == 1).order_by(Order.create_time.desc())),
+        ('学生订单游标翻页', Order.query.filter(
+            Order.student_id == 1,
+            db.or_(Order.create_time < '2025-01-01', db.and_(Order.create_time == '2025-01-01', Order.id < 100))
+        ).order_by(Order.create_time.desc(), Order.id.desc())),
+        ('订单项批量加载', OrderItem.query.filter(OrderItem.order_id.in_([1, 2, 3]))),
+        ('菜品的订单项', OrderItem.query.filter(OrderItem.dish_id == 1)),
+        ('商户评价列表', Comment.query.filter(Comment.merchant_id == 1).order_by(Comment.create_time.desc())),
+        ('学生评价列表', Comment.query.filter(Comment.student_id == 1).order_by(Comment.create_time.desc())),
+        ('评价管理列表', Comment.query.order_by(Comment.create_time.desc(), Comment.id.desc())),
+        ('商户投诉筛选', Complaint.query.filter(Complaint.merchant_id == 1, Complaint.status == '待处理')),
+        ('商户上架菜品', Dish.query.filter(Dish.merchant_id == 1, Dish.is_shelf == True)),
+        ('按分类查询菜品', Dish.query.filter(Dish.category == '主食')),
+    ]
+
+def explain(query) -> list:
+    """返回查询计划中每一步的描述"""
+    sql = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')).all()
+    return [row[-1] for row in rows]
+
+def table_scans(plan: list) -> list:
+    """查询计划中未使用索引的全表扫描步骤"""
+    return [step for step in plan if step.startswith('SCAN') and 'USING' not in step]
+
+def check_query_plans() -> list:
+    """检查全部热点查询，返回 [(名称, 查询计划, 全表扫描步骤)]"""
+    results = []
+    for name, query in hot_queries():
+        plan = explain(query)
+        results.append((name, plan, table_scans(plan)))
+    return results
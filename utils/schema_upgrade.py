@@ -0,0 +1,171 @@
+from sqlalchemy import inspect, text
+from extensions import db
+
+# 在 db.create_all() 之后执行：create_all 只会建新表，不会给已有表补字段，
+# 因此已有数据库上的字段新增、数据回填都在这里按步骤完成（每一步都需可重复执行）
+
+def _get_columns(table_name):
+    """获取表的现有字段名"""
+    inspector = inspect(db.engine)
+    return [col['name'] for col in inspector.get_columns(table_name)]
+
+def _add_dish_sales():
+    """菜品表新增 sales 销量计数字段，并按已送达订单回填"""
+    if 'sales' in _get_columns('dish'):
+        return
+    print('检测到菜品表缺少sales字段，正在更新数据库结构...')
+    db.session.execute(text("ALTER TABLE dish ADD COLUMN sales INTEGER NOT NULL DEFAULT 0"))
+    db.session.commit()
+
+    from services.sales_service import rebuild_dish_sales
+    rebuild_dish_sales()
+    print('菜品sales字段添加并回填完成')
+
+def _open_delivery_fee_total():
+    """配送费总收入改为累计值：累计行不存在时按现有流水之和初始化（需在写入任何流水之前执行）"""
+    from models.delivery_fee_ledger import DeliveryFeeLedger, DeliveryFeeTotal
+    if db.session.get(DeliveryFeeTotal, DeliveryFeeTotal.ROW_ID) is not None:
+        return
+    db.session.add(DeliveryFeeTotal(id=DeliveryFeeTotal.ROW_ID, total=DeliveryFeeLedger.sum_entries()))
+    db.session.commit()
+
+def _open_delivery_fee_ledger():
+    """配送费收入改为流水记账：流水为空时，把配置表中的原有总收入记为期初流水"""
+    from models.delivery_fee_ledger import DeliveryFeeLedger
+    from models.platform_config import PlatformConfig
+    if DeliveryFeeLedger.query.first() is not None:
+        return
+    config = PlatformConfig.get_by_key('delivery_fee_earnings')
+    opening = round(float(config.config_value or 0), 2) if config else 0.0
+    if not opening:
+        return
+    DeliveryFeeLedger.record(opening, 'opening', remark='由配置表迁移的期初配送费收入')
+    db.session.commit()
+    print(f'配送费收入期初流水已写入：¥{opening:.2f}')
+
+def _build_merchant_stats():
+    """商户经营汇总表为空而已有订单时（首次升级），根据订单表回填"""
+    from models.merchant_stats import MerchantHourlyStats
+    from models.order import Order
+    if MerchantHourlyStats.query.first() is not None or Order.query.first() is None:
+        return
+    from services.stats_rollup_service import rebuild_merchant_stats
+    buckets = rebuild_merchant_stats()
+    print(f'商户经营汇总回填完成，共 {buckets} 个小时桶')
+
+def _add_order_item_dish_name():
+    """订单项新增 dish_name 菜品名称快照字段，并用当前菜品名称回填"""
+    if 'dish_name' in _get_columns('food_order_item'):
+        return
+    print('检测到订单项表缺少dish_name字段，正在更新数据库结构...')
+    db.session.execute(text("ALTER TABLE food_order_item ADD COLUMN dish_name VARCHAR(100)"))
+    db.session.execute(text(
+        "UPDATE food_order_item SET dish_name = "
+        "(SELECT dish.dish_name FROM dish WHERE dish.id = food_order_item.dish_id)"
+    ))
+    db.session.commit()
+    print('订单项dish_name字段添加并回填完成')
+
+def _add_order_item_img_url():
+    """订单项新增 img_url 菜品图片快照字段，并用当前菜品图片回填"""
+    if 'img_url' in _get_columns('food_order_item'):
+        return
+    print('检测到订单项表缺少img_url字段，正在更新数据库结构...')
+    db.session.execute(text("ALTER TABLE food_order_item ADD COLUMN img_url VARCHAR(255)"))
+    db.session.execute(text(
+        "UPDATE food_order_item SET img_url = "
+        "(SELECT dish.img_url FROM dish WHERE dish.id = food_order_item.dish_id)"
+    ))
+    db.session.commit()
+    print('订单项img_url字段添加并回填完成')
+
+def _add_merchant_hours_update_time():
+    """商户表新增 hours_update_time 营业时间修改时间字段（索引由 _create_indexes 补建）"""
+    if 'hours_update_time' in _get_columns('merchant'):
+        return
+    db.session.execute(text("ALTER TABLE merchant ADD COLUMN hours_update_time DATETIME"))
+    db.session.commit()
+    print('商户表hours_update_time字段添加完成')
+
+def _widen_merchant_business_hours():
+    """商户营业时间字段由 VARCHAR(50) 扩展为 VARCHAR(100)，以容纳多时段/按星期的写法
+
+    SQLite 不限制 VARCHAR 长度，无需修改；MySQL/PostgreSQL 上字段长度不足时修改字段类型
+    """
+    from utils.business_hours import MAX_LENGTH
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return
+    column = next((col for col in inspect(db.engine).get_columns('merchant') if col['name'] == 'business_hours'), None)
+    length = getattr(column['type'], 'length', None) if column else None
+    if length is None or length >= MAX_LENGTH:
+        return
+    if dialect == 'mysql':
+        # MODIFY COLUMN 会覆盖原有定义，需带上字段注释
+        from models.merchant import Merchant
+        comment = Merchant.business_hours.comment.replace("'", "''")
+        db.session.execute(text(
+            f"ALTER TABLE merchant MODIFY COLUMN business_hours VARCHAR({MAX_LENGTH}) COMMENT '{comment}'"
+        ))
+    else:
+        db.session.execute(text(f"ALTER TABLE merchant ALTER COLUMN business_hours TYPE VARCHAR({MAX_LENGTH})"))
+    db.session.commit()
+    print(f'商户表business_hours字段长度已扩展为{MAX_LENGTH}')
+
+def _move_outbox_order_notifications():
+    """订单通知改由通知队列发送：把升级前写入发件箱、尚未处理的 order.notify 事件转入通知队列"""
+    from datetime import datetime
+    from models.outbox import OutboxEvent
+    from services.notification_service import notify_orders
+    events = OutboxEvent.query.filter(
+        OutboxEvent.event_type == 'order.notify',
+        OutboxEvent.status.in_(['待处理', '处理中'])
+    ).all()
+    if not events:
+        return
+    payloads = [event.get_payload() for event in events]
+    notify_orders([(payload['phone'], payload['order_no'], payload['status']) for payload in payloads])
+    for event in events:
+        event.status = '已完成'
+        event.processed_time = datetime.now()
+    db.session.commit()
+    print(f'已将 {len(events)} 条发件箱订单通知转入通知队列')
+
+def _create_indexes():
+    """为已有数据库补建模型中声明的索引（create_all 不会给已存在的表加索引）"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=db.engine)
+                created.append(index.name)
+    if created:
+        print(f'已补建索引：{", ".join(created)}')
+
+# 按顺序执行的升级步骤
+UPGRADE_STEPS = [
+    _add_dish_sales,
+    _open_delivery_fee_total,
+    _open_delivery_fee_ledger,
+    _build_merchant_stats,
+    _add_order_item_dish_name,
+    _add_order_item_img_url,
+    _add_merchant_hours_update_time,
+    _widen_merchant_business_hours,
+    _move_outbox_order_notifications,
+    _create_indexes,
+]
+
+def upgrade_schema():
+    """依次执行所有数据库升级步骤"""
+    for step in UPGRADE_STEPS:
+        try:
+            step()
+        except Exception as e:
+            print(f'数据库升级步骤 {step.__name__} 执行失败：{e}')
+            db.session.rollback()
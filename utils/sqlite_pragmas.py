@@ -0,0 +1,33 @@
+import sqlite3
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# SQLite 连接参数：每个新建的数据库连接都执行 Config.SQLITE_PRAGMAS 中的 PRAGMA。
+# WAL 模式下读操作不会被写事务阻塞，busy_timeout 让并发写入排队等待而不是立即报 database is locked
+
+_pragmas = {}
+_registered = False
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    """新建连接时执行 PRAGMA（只对 SQLite 连接生效）"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in _pragmas.items():
+            try:
+                cursor.execute(f'PRAGMA {name}={value}')
+            except sqlite3.OperationalError:
+                # 只读连接（mode=ro）不能修改 journal_mode 等持久设置，跳过即可，文件已由主库连接设置
+                pass
+    finally:
+        cursor.close()
+
+def register_sqlite_pragmas(pragmas: dict):
+    """注册连接钩子（进程内只注册一次，重复调用时更新 PRAGMA 配置），需在创建数据库连接之前调用"""
+    global _registered
+    _pragmas.clear()
+    _pragmas.update(pragmas or {})
+    if not _registered:
+        event.listen(Engine, 'connect', _apply_pragmas)
+        _registered = True